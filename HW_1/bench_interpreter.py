@@ -0,0 +1,255 @@
+import decimal
+import importlib.util
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Модуль інтерпретатора має дефіс у назві, тому завантажуємо його за шляхом
+spec = importlib.util.spec_from_file_location(
+    "calculator", Path(__file__).with_name("goit-cs-hw-02.py")
+)
+calculator = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(calculator)
+
+FORMULA = "(3 + 5) * (10 - 4) / 2 + 7 * (8 - 6) - (9 + 1) / 5"
+
+
+def measure(label, func, repeat):
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = time.perf_counter() - start_time
+    print(f"{label:<42} {elapsed:8.4f} сек  {repeat / elapsed:12,.0f} викл./сек")
+    return elapsed
+
+
+def bench_compile(repeat=20_000):
+    """Порівнюємо деревоподібний Interpreter зі скомпільованим виразом."""
+    print(f"Вираз: {FORMULA}")
+    tree = calculator.Parser(calculator.Lexer(FORMULA)).expr()
+    interpreter = calculator.Interpreter(None)
+    compiled = calculator.Compiler().compile(tree)
+
+    def interpret_text():
+        lexer = calculator.Lexer(FORMULA)
+        return calculator.Interpreter(calculator.Parser(lexer)).interpret()
+
+    baseline = measure("Interpreter (лексер + парсер + обхід)", interpret_text, repeat)
+    measure("Interpreter.visit (готове дерево)", lambda: interpreter.visit(tree), repeat)
+    measure("CompiledExpression.execute (байткод)", compiled.execute, repeat)
+    compiled_time = measure("CompiledExpression() (code object)", compiled, repeat)
+    print(f"Прискорення code object проти Interpreter: {baseline / compiled_time:.1f}x")
+
+
+def build_long_expression(size_mb):
+    """Будуємо плаский вираз приблизно заданого розміру в мегабайтах."""
+    chunk = "12345 + price * (678 - 9) / 3 - 4242 * qty + "
+    count = size_mb * 1024 * 1024 // len(chunk)
+    return chunk * count + "1"
+
+
+def drain(lexer):
+    count = 0
+    while lexer.get_next_token().type != calculator.TokenType.EOF:
+        count += 1
+    return count
+
+
+def bench_lexer(size_mb=2):
+    """Пропускна здатність Lexer проти однопрохідного tokenize/RegexLexer."""
+    text = build_long_expression(size_mb)
+    print(f"Розмір виразу: {len(text) / 1024 / 1024:.1f} МБ")
+    for label, make_lexer in (
+        ("Lexer (посимвольно)", calculator.Lexer),
+        ("RegexLexer (один прохід)", calculator.RegexLexer),
+    ):
+        start_time = time.perf_counter()
+        tokens = drain(make_lexer(text))
+        lex_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        calculator.Parser(make_lexer(text)).expr()
+        parse_time = time.perf_counter() - start_time
+        print(
+            f"{label:<26} токенізація {lex_time:7.3f} сек "
+            f"({len(text) / lex_time / 1024 / 1024:6.1f} МБ/сек, {tokens / lex_time:12,.0f} токенів/сек), "
+            f"з парсером {parse_time:7.3f} сек"
+        )
+
+
+def build_generated_expression(depth, seed=42):
+    """Випадковий вираз зі змінними, константами й підвиразами, що повторюються."""
+    rng = random.Random(seed)
+    leaves = ["x", "y", "z", "0", "1", "2", "3"]
+    pool = []
+
+    def build(level):
+        if level == 0 or rng.random() < 0.05:
+            return rng.choice(leaves)
+        if pool and rng.random() < 0.3:
+            return rng.choice(pool)
+        text = f"({build(level - 1)} {rng.choice('+-*')} {build(level - 1)})"
+        pool.append(text)
+        return text
+
+    return build(depth)
+
+
+def bench_optimize(depth=12, repeat=2_000):
+    """Кількість вузлів і швидкість до та після optimize (згортання + CSE)."""
+    text = build_generated_expression(depth)
+    tree = calculator.Parser(calculator.RegexLexer(text)).expr()
+    optimized = calculator.optimize(tree)
+    print(f"Довжина виразу: {len(text):,} символів")
+    print(f"Вузлів до оптимізації:    {calculator.count_nodes(tree):,}")
+    print(f"Вузлів після оптимізації: {calculator.count_nodes(optimized):,}")
+
+    plain = calculator.Compiler().compile(tree)
+    compiled = calculator.Compiler().compile(optimized)
+    print(f"Інструкцій байткоду: {len(plain.code):,} -> {len(compiled.code):,}")
+    variables = {"x": 3, "y": 5, "z": 7}
+    assert plain(**variables) == compiled(**variables)
+    baseline = measure("Без оптимізації", lambda: plain(**variables), repeat)
+    optimized_time = measure("З optimize", lambda: compiled(**variables), repeat)
+    print(f"Прискорення: {baseline / optimized_time:.1f}x")
+
+
+def bench_nesting(depths=(100, 1_000, 10_000, 100_000)):
+    """Глибоко вкладені дужки: рекурсивні Parser/Interpreter проти ітеративних."""
+    for depth in depths:
+        text = "(" * depth + "x" + " + 1)" * depth
+        variables = {"x": 1}
+
+        try:
+            tree = calculator.Parser(calculator.RegexLexer(text)).expr()
+            result = calculator.Interpreter(None, variables).visit(tree)
+            recursive = f"результат {result}"
+        except RecursionError:
+            recursive = "RecursionError"
+
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        tree = calculator.IterativeParser(calculator.RegexLexer(text)).expr()
+        result = calculator.IterativeInterpreter(None, variables).visit(tree)
+        elapsed = time.perf_counter() - start_time
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        # Дерево лінійне за розміром виразу, тож пам'ять на рівень має бути сталою
+        print(
+            f"глибина {depth:>7,}: Parser/Interpreter - {recursive:<16} "
+            f"ітеративні - результат {result} за {elapsed:.3f} сек, "
+            f"пік пам'яті {peak / 1024 / 1024:.1f} МБ ({peak / depth:.0f} байт на рівень)"
+        )
+
+
+class DictToken:
+    """Токен і вузли у вигляді звичайних класів з __dict__ - для порівняння."""
+
+    def __init__(self, type, value):
+        self.type = type
+        self.value = value
+
+
+class DictBinOp:
+    def __init__(self, left, op, right):
+        self.left = left
+        self.op = op
+        self.right = right
+
+
+class DictNum:
+    def __init__(self, token):
+        self.token = token
+        self.value = token.value
+
+
+def to_dict_tree(tree, dict_tokens):
+    """Копіюємо дерево у класи з __dict__ з тими самими (спільними) токенами."""
+    copies = {}
+    for node in calculator.iter_postorder(tree):
+        if isinstance(node, calculator.BinOp):
+            op = dict_tokens[node.op.type, node.op.value]
+            copies[id(node)] = DictBinOp(copies[id(node.left)], op, copies[id(node.right)])
+        else:
+            copies[id(node)] = DictNum(dict_tokens[calculator.TokenType.INTEGER, node.value])
+    return copies[id(tree)]
+
+
+def traced_size(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def bench_memory(size_mb=1):
+    """Пам'ять дерева: класи з __slots__ проти звичайних класів з __dict__."""
+    text = build_long_expression(size_mb).replace("price", "7").replace("qty", "11")
+    # Обидва дерева будуються з одного списку токенів, створеного до вимірювань:
+    # токени не рахуються ні з того, ні з іншого боку, тож різниця - лише вузли
+    tokens = calculator.tokenize(text)
+    dict_tokens = {
+        (token.type, token.value): DictToken(token.type, token.value)
+        for token in tokens
+        if token is not None
+    }
+    tree, slots_size = traced_size(
+        lambda: calculator.IterativeParser(calculator.TokenStream(tokens)).expr()
+    )
+    _, dict_size = traced_size(lambda: to_dict_tree(tree, dict_tokens))
+    nodes = calculator.count_nodes(tree)
+    print(f"Розмір виразу: {len(text) / 1024 / 1024:.1f} МБ, вузлів: {nodes:,}")
+    for label, size in (("класи з __dict__", dict_size), ("класи з __slots__", slots_size)):
+        print(
+            f"{label:<18} {size / 1024 / 1024:7.1f} МБ  "
+            f"{size / nodes:5.0f} байт/вузол  {size / len(text):5.1f}x від тексту"
+        )
+    print(f"Економія: {dict_size / slots_size:.1f}x")
+
+
+def bench_modes(digits=300, repeat=20_000):
+    """Пропускна здатність числових режимів на великих операндах."""
+    rng = random.Random(7)
+    text = "(a * b + c) / d - (a - c) * 3 / (b + 1)"
+    variables = {
+        name: rng.randrange(10 ** (digits - 1), 10**digits) for name in ("a", "b", "c", "d")
+    }
+    print(f"Вираз: {text}, операнди по {digits} цифр")
+    modes = [
+        ("float", "float"),
+        ("int", "int"),
+        ("fraction", "fraction"),
+        ("decimal (prec=28)", "decimal"),
+        ("decimal (prec=100)", calculator.NumericMode.decimal(decimal.Context(prec=100))),
+    ]
+    for label, mode in modes:
+        compiled = calculator.compile_expression(text, mode=mode)
+        measure(f"{label:<20} CompiledExpression()", lambda: compiled(**variables), repeat)
+        # Інтерпретатор створюємо на кожен виклик: він перетворює змінні в __init__
+        tree = calculator.Parser(calculator.RegexLexer(text)).expr()
+        measure(
+            f"{label:<20} Interpreter.visit",
+            lambda: calculator.Interpreter(None, variables, mode).visit(tree),
+            repeat // 4,
+        )
+
+
+BENCHMARKS = {
+    "compile": bench_compile,
+    "lexer": bench_lexer,
+    "optimize": bench_optimize,
+    "nesting": bench_nesting,
+    "memory": bench_memory,
+    "modes": bench_modes,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print(f"=== {name}")
+        BENCHMARKS[name]()
+        print()
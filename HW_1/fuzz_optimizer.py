@@ -0,0 +1,104 @@
+import argparse
+import decimal
+import importlib.util
+import random
+import sys
+from fractions import Fraction
+from pathlib import Path
+
+# Модуль інтерпретатора має дефіс у назві, тому завантажуємо його за шляхом
+spec = importlib.util.spec_from_file_location(
+    "calculator", Path(__file__).with_name("goit-cs-hw-02.py")
+)
+calculator = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(calculator)
+
+# Диференційне тестування: випадкові вирази обчислюємо деревоподібним
+# Interpreter (без оптимізацій) і через optimize + CompiledExpression (і
+# згенерований code object, і стекову машину). Результати мають збігатися
+# до типу, знака нуля й nan, а помилки - до класу винятку:
+#
+#     python fuzz_optimizer.py
+#     python fuzz_optimizer.py --count 100000 --seed 3 --mode decimal
+
+D = decimal.Decimal
+
+# Значення змінних для кожного режиму, зокрема ті, що ламають тотожності:
+# -0.0, inf, nan, а також значення, які режим має відхилити
+VALUES = {
+    "float": [0, 1, -3, 7, 2.5, 0.0, -0.0, float("inf"), float("-inf"), float("nan")],
+    "int": [0, 1, -3, 7, 2.5, float("inf"), float("nan")],
+    "fraction": [0, 1, -3, 7, Fraction(1, 3), 2.5, float("inf"), float("nan")],
+    "decimal": [0, 1, -3, 7, D("2.50"), D("-0"), D("Infinity"), D("-Infinity"), D("NaN")],
+}
+
+NAMES = ("x", "y")
+
+
+def random_expression(rng, depth):
+    if depth == 0 or rng.random() < 0.3:
+        return rng.choice([*NAMES, "0", "0", "1", str(rng.randint(2, 7))])
+    left = random_expression(rng, depth - 1)
+    right = random_expression(rng, depth - 1)
+    return f"({left} {rng.choice('+-*/')} {right})"
+
+
+def outcome(func):
+    # (тип результату, repr) або (клас винятку, None); repr розрізняє -0.0 і 0.0,
+    # Decimal("0.0") і Decimal("0"), а nan у repr дорівнює nan
+    try:
+        result = func()
+    except Exception as e:
+        return type(e).__name__, None
+    return type(result).__name__, repr(result)
+
+
+def check(text, variables, mode):
+    tree = calculator.Parser(calculator.Lexer(text)).expr()
+    # Interpreter перетворює всі передані змінні, тож передаємо лише ті, що є у виразі
+    variables = {name: variables[name] for name in calculator.variable_names(tree)}
+    expected = outcome(lambda: calculator.Interpreter(None, variables, mode).visit(tree))
+    compiled = calculator.compile_expression(text, mode=mode)
+    # Перший виклик CompiledExpression виконується стековою машиною, другий -
+    # згенерованим code object
+    for label, func in (
+        ("CompiledExpression() (1-й виклик)", lambda: compiled(**variables)),
+        ("CompiledExpression() (code object)", lambda: compiled(**variables)),
+        ("execute()", lambda: compiled.execute(**variables)),
+    ):
+        actual = outcome(func)
+        if actual != expected:
+            return f"{label}: {actual} замість {expected}"
+    return None
+
+
+def fuzz(mode, count, seed, depth=5, show=5):
+    rng = random.Random(seed)
+    values = VALUES[mode]
+    mismatches = 0
+    for _ in range(count):
+        text = random_expression(rng, depth)
+        variables = {name: rng.choice(values) for name in NAMES}
+        error = check(text, variables, mode)
+        if error is not None:
+            mismatches += 1
+            if mismatches <= show:
+                print(f"  {mode}: {text} при {variables}: {error}")
+    print(f"{mode:<9} {count:,} виразів, розбіжностей: {mismatches}")
+    return mismatches
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Порівняння optimize + компілятора з Interpreter")
+    parser.add_argument("--count", type=int, default=20_000, help="виразів на режим")
+    parser.add_argument("--seed", type=int, default=0, help="зерно генератора")
+    parser.add_argument(
+        "--mode", choices=sorted(VALUES), action="append", help="режим (за замовчуванням - усі)"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    total = sum(fuzz(mode, args.count, args.seed) for mode in args.mode or VALUES)
+    sys.exit(1 if total else 0)
@@ -1,3 +1,22 @@
+import argparse
+import decimal
+import json
+import operator
+import os
+import re
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+from itertools import islice
+
+try:
+    import numpy as np
+except ImportError:  # NumPy не обов'язковий: evaluate_batch працює і без нього
+    np = None
+
+
 class LexicalError(Exception):
     pass
 
@@ -8,6 +27,7 @@ class ParsingError(Exception):
 
 class TokenType:
     INTEGER = "INTEGER"
+    ID = "ID"
     PLUS = "PLUS"
     MINUS = "MINUS"
     MUL = "MUL"
@@ -18,6 +38,8 @@ class TokenType:
 
 
 class Token:
+    __slots__ = ("type", "value")
+
     def __init__(self, type, value):
         self.type = type
         self.value = value
@@ -47,11 +69,19 @@ class Lexer:
 
     def integer(self):
         """Повертаємо ціле число, зібране з послідовності цифр."""
-        result = ""
+        start = self.pos
         while self.current_char is not None and self.current_char.isdigit():
-            result += self.current_char
             self.advance()
-        return int(result)
+        return int(self.text[start : self.pos])
+
+    def identifier(self):
+        """Повертаємо ім'я змінної: літера або '_', далі літери, цифри або '_'."""
+        start = self.pos
+        while self.current_char is not None and (
+            self.current_char.isalnum() or self.current_char == "_"
+        ):
+            self.advance()
+        return self.text[start : self.pos]
 
     def get_next_token(self):
         """Лексичний аналізатор, що розбиває вхідний рядок на токени."""
@@ -63,6 +93,9 @@ class Lexer:
             if self.current_char.isdigit():
                 return Token(TokenType.INTEGER, self.integer())
 
+            if self.current_char.isalpha() or self.current_char == "_":
+                return Token(TokenType.ID, self.identifier())
+
             if self.current_char == "+":
                 self.advance()
                 return Token(TokenType.PLUS, "+")
@@ -92,11 +125,88 @@ class Lexer:
         return Token(TokenType.EOF, None)
 
 
+# Один прохід регулярним виразом: число, ім'я або будь-який інший непробільний
+# символ. Пробіли між лексемами findall пропускає сам.
+TOKEN_PATTERN = re.compile(r"\d+|[^\W\d]\w*|\S")
+
+# Перший символ імені: якщо його в тексті немає, у виразі немає змінних
+NAME_START_PATTERN = re.compile(r"[^\W\d]")
+
+# Токени операторів не мають стану, тому створюються один раз
+OPERATOR_TOKENS = {
+    "+": Token(TokenType.PLUS, "+"),
+    "-": Token(TokenType.MINUS, "-"),
+    "*": Token(TokenType.MUL, "*"),
+    "/": Token(TokenType.DIV, "/"),
+    "(": Token(TokenType.LPAREN, "("),
+    ")": Token(TokenType.RPAREN, ")"),
+}
+
+EOF_TOKEN = Token(TokenType.EOF, None)
+
+
+def tokenize(text):
+    """
+    Розбиваємо весь рядок на список токенів за один прохід.
+
+    Однакові лексеми отримують один і той самий об'єкт `Token`, тож токени
+    створюються лише для різних чисел та імен. Якщо трапляється невідомий
+    символ, список закінчується маркером `None`: помилка виникне лише тоді,
+    коли парсер до нього дійде, як і з `Lexer`.
+    """
+    tokens = []
+    append = tokens.append
+    known = dict(OPERATOR_TOKENS)
+    lookup = known.get
+    for lexeme in TOKEN_PATTERN.findall(text):
+        token = lookup(lexeme)
+        if token is None:
+            first = lexeme[0]
+            if first.isdigit():
+                token = Token(TokenType.INTEGER, int(lexeme))
+            elif first.isalpha() or first == "_":
+                token = Token(TokenType.ID, lexeme)
+            else:
+                append(None)
+                break
+            known[lexeme] = token
+        append(token)
+    return tokens
+
+
+class TokenStream:
+    """Видає вже готові токени за індексом з тим самим інтерфейсом, що й `Lexer`."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def get_next_token(self):
+        if self.pos >= len(self.tokens):
+            return EOF_TOKEN
+        token = self.tokens[self.pos]
+        if token is None:
+            raise LexicalError("Помилка лексичного аналізу")
+        self.pos += 1
+        return token
+
+
+class RegexLexer(TokenStream):
+    """Лексер, що токенізує весь вхідний рядок одразу через `tokenize`."""
+
+    def __init__(self, text):
+        super().__init__(tokenize(text))
+
+
+# Вузли дерева використовують __slots__: без __dict__ кожен вузол займає
+# в кілька разів менше пам'яті, що відчутно на великих виразах
 class AST:
-    pass
+    __slots__ = ()
 
 
 class BinOp(AST):
+    __slots__ = ("left", "op", "right")
+
     def __init__(self, left, op, right):
         self.left = left
         self.op = op
@@ -104,11 +214,20 @@ class BinOp(AST):
 
 
 class Num(AST):
+    # Зберігаємо лише значення: тип токена для числа завжди INTEGER
+    __slots__ = ("value",)
+
     def __init__(self, token):
-        self.token = token
         self.value = token.value
 
 
+class Var(AST):
+    __slots__ = ("name",)
+
+    def __init__(self, token):
+        self.name = token.value
+
+
 class Parser:
     def __init__(self, lexer):
         self.lexer = lexer
@@ -132,6 +251,9 @@ class Parser:
         if token.type == TokenType.INTEGER:
             self.eat(TokenType.INTEGER)
             return Num(token)
+        elif token.type == TokenType.ID:
+            self.eat(TokenType.ID)
+            return Var(token)
         elif token.type == TokenType.LPAREN:
             self.eat(TokenType.LPAREN)
             node = self.expr()
@@ -165,10 +287,89 @@ class Parser:
         return node
 
 
+# Пріоритети бінарних операторів для IterativeParser
+PRECEDENCE = {
+    TokenType.PLUS: 1,
+    TokenType.MINUS: 1,
+    TokenType.MUL: 2,
+    TokenType.DIV: 2,
+}
+
+
+class IterativeParser(Parser):
+    """
+    Парсер без рекурсії (алгоритм сортувальної станції) з явними стеками
+    операндів та операторів. Будує таке саме дерево, що й `Parser`, і
+    помиляється в тих самих місцях, але глибина вкладеності дужок не
+    обмежена лімітом рекурсії Python.
+    """
+
+    def expr(self):
+        operands = []
+        operators = []  # токени операторів та відкритих дужок
+        depth = 0
+
+        while True:
+            # Очікуємо операнд: відкриті дужки, потім число або змінна
+            token = self.current_token
+            while token.type == TokenType.LPAREN:
+                self.eat(TokenType.LPAREN)
+                operators.append(token)
+                depth += 1
+                token = self.current_token
+            if token.type == TokenType.INTEGER:
+                self.eat(TokenType.INTEGER)
+                operands.append(Num(token))
+            elif token.type == TokenType.ID:
+                self.eat(TokenType.ID)
+                operands.append(Var(token))
+            else:
+                self.error()
+
+            # Після операнда закриваємо дужки, доки це можливо
+            token = self.current_token
+            while token.type == TokenType.RPAREN and depth:
+                self.eat(TokenType.RPAREN)
+                while operators[-1].type != TokenType.LPAREN:
+                    self._reduce(operands, operators)
+                operators.pop()
+                depth -= 1
+                token = self.current_token
+
+            if token.type in PRECEDENCE:
+                precedence = PRECEDENCE[token.type]
+                while (
+                    operators
+                    and operators[-1].type != TokenType.LPAREN
+                    and PRECEDENCE[operators[-1].type] >= precedence
+                ):
+                    self._reduce(operands, operators)
+                self.eat(token.type)
+                operators.append(token)
+                continue
+
+            # Вираз закінчився; незакрита дужка - та сама помилка, що й у Parser
+            if depth:
+                self.error()
+            break
+
+        while operators:
+            self._reduce(operands, operators)
+        return operands[0]
+
+    @staticmethod
+    def _reduce(operands, operators):
+        right = operands.pop()
+        left = operands.pop()
+        operands.append(BinOp(left=left, op=operators.pop(), right=right))
+
+
 def print_ast(node, level=0):
     indent = "  " * level
     if isinstance(node, Num):
         print(f"{indent}Num({node.value})")
+    elif isinstance(node, Var):
+        print(f"{indent}Var({node.name})")
     elif isinstance(node, BinOp):
         print(f"{indent}BinOp:")
         print(f"{indent}  left: ")
@@ -181,21 +382,33 @@ def print_ast(node, level=0):
 
 
 class Interpreter:
-    def __init__(self, parser):
+    def __init__(self, parser, variables=None, mode="float"):
         self.parser = parser
+        self.mode = get_numeric_mode(mode)
+        # Функції операцій вибираємо один раз для режиму, а не на кожному вузлі
+        self.operators = {
+            token_type: self.mode.operators[opcode]
+            for token_type, opcode in BINARY_OPCODES.items()
+        }
+        self.convert = self.mode.convert
+        variables = variables or {}
+        if self.convert is not None:
+            variables = {name: self.convert(value) for name, value in variables.items()}
+        self.variables = variables
 
     def visit_BinOp(self, node):
-        if node.op.type == TokenType.PLUS:
-            return self.visit(node.left) + self.visit(node.right)
-        elif node.op.type == TokenType.MINUS:
-            return self.visit(node.left) - self.visit(node.right)
-        elif node.op.type == TokenType.MUL:
-            return self.visit(node.left) * self.visit(node.right)
-        elif node.op.type == TokenType.DIV:
-            return self.visit(node.left) / self.visit(node.right)
+        return self.operators[node.op.type](self.visit(node.left), self.visit(node.right))
 
     def visit_Num(self, node):
-        return node.value
+        if self.convert is None:
+            return node.value
+        return self.convert(node.value)
+
+    def visit_Var(self, node):
+        try:
+            return self.variables[node.name]
+        except KeyError:
+            raise NameError(f"Невідома змінна: {node.name}") from None
 
     def interpret(self):
         tree = self.parser.expr()
@@ -210,21 +423,943 @@ class Interpreter:
         raise Exception(f"Немає методу visit_{type(node).__name__}")
 
 
-def main():
+class IterativeInterpreter(Interpreter):
+    """Обчислює дерево явним стеком значень замість рекурсивних викликів visit."""
+
+    def visit(self, node):
+        return self.evaluate(iter_postorder(node))
+
+    def evaluate(self, nodes):
+        """Обчислюємо вузли, видані у зворотному порядку (діти перед батьком)."""
+        values = []
+        push = values.append
+        pop = values.pop
+        operators = self.operators
+        for node in nodes:
+            if isinstance(node, BinOp):
+                right = pop()
+                push(operators[node.op.type](pop(), right))
+            elif isinstance(node, Num):
+                push(self.visit_Num(node))
+            elif isinstance(node, Var):
+                push(self.visit_Var(node))
+            else:
+                self.generic_visit(node)
+        return pop()
+
+
+class OpCode:
+    PUSH_CONST = "PUSH_CONST"
+    LOAD_NAME = "LOAD_NAME"
+    STORE_TEMP = "STORE_TEMP"  # Запам'ятовує вершину стеку (спільний підвираз)
+    LOAD_TEMP = "LOAD_TEMP"
+    ADD = "ADD"
+    SUB = "SUB"
+    MUL = "MUL"
+    DIV = "DIV"
+
+
+BINARY_OPCODES = {
+    TokenType.PLUS: OpCode.ADD,
+    TokenType.MINUS: OpCode.SUB,
+    TokenType.MUL: OpCode.MUL,
+    TokenType.DIV: OpCode.DIV,
+}
+
+BINARY_OPERATORS = {
+    OpCode.ADD: operator.add,
+    OpCode.SUB: operator.sub,
+    OpCode.MUL: operator.mul,
+    OpCode.DIV: operator.truediv,
+}
+
+PYTHON_OPERATORS = {
+    OpCode.ADD: "+",
+    OpCode.SUB: "-",
+    OpCode.MUL: "*",
+    OpCode.DIV: "/",
+}
+
+
+def checked_division(divide):
+    """
+    Int, fraction і decimal повідомляють про ділення на нуль як "integer
+    division or modulo by zero", `Fraction(1, 0)` або
+    `[<class 'decimal.DivisionByZero'>]` (а 0/0 у decimal - як
+    InvalidOperation); зводимо це до того самого повідомлення, що й у режимі
+    float. Якщо пастки decimal вимкнені, результат (Infinity, NaN) не чіпаємо.
+    """
+
+    def division(left, right):
+        try:
+            return divide(left, right)
+        except (ZeroDivisionError, decimal.InvalidOperation):
+            if right == 0:
+                raise ZeroDivisionError("division by zero") from None
+            raise
+
+    return division
+
+
+def checked_array_division(divide):
+    """
+    Ділення масивів NumPy: 0/0 дає nan з попередженням "invalid", а не помилку
+    ділення, тож нульові дільники перевіряємо явно - як ZeroDivisionError
+    у Python при обчисленні по рядках.
+    """
+
+    def division(left, right):
+        if np.any(np.equal(right, 0)):
+            raise ZeroDivisionError("division by zero")
+        return divide(left, right)
+
+    return division
+
+
+class NumericMode:
+    """
+    Числовий режим обчислень: функції для кожної операції, перетворення
+    літералів і змінних до типу режиму та (за наявності) оператори Python
+    для згенерованого коду. Інтерпретатор і компілятор вибирають усе це
+    один раз під час створення, тож під час обчислення типи не перевіряються.
+    """
+
+    def __init__(self, name, operators, convert=None, symbols=None, exact=False):
+        self.name = name
+        self.operators = operators  # OpCode -> функція двох аргументів
+        self.convert = convert  # None - значення беруться як є
+        # OpCode -> оператор Python; операції без оператора (або всі, якщо
+        # None) згенерований код викликає як функції
+        self.symbols = symbols or {}
+        # Чи значення режиму завжди скінченні, одного типу і без -0 (int,
+        # fraction): лише тоді тотожності x+0 і x*0 не змінюють результат
+        self.exact = exact
+
+    def __repr__(self):
+        return f"NumericMode({self.name!r})"
+
+    @classmethod
+    def decimal(cls, context=None):
+        """Режим `decimal` із заданим контекстом (точність, округлення, пастки)."""
+        context = context or decimal.Context()
+        operators = {
+            OpCode.ADD: context.add,
+            OpCode.SUB: context.subtract,
+            OpCode.MUL: context.multiply,
+            OpCode.DIV: checked_division(context.divide),
+        }
+        return cls("decimal", operators, convert=context.create_decimal)
+
+
+# Поведінка за замовчуванням: цілі літерали, ділення дає float
+FLOAT_MODE = NumericMode("float", BINARY_OPERATORS, symbols=PYTHON_OPERATORS)
+
+# Оператори Python без ділення: режими int і fraction ділять через checked_division
+SYMBOLS_WITHOUT_DIV = {
+    opcode: symbol for opcode, symbol in PYTHON_OPERATORS.items() if opcode != OpCode.DIV
+}
+
+# Лише цілі числа: ділення цілочисельне (з округленням донизу). Змінні
+# проходять через operator.index, тож float (напр. 2.5) відхиляється, а не
+# перетворює обчислення на дробове
+INT_MODE = NumericMode(
+    "int",
+    {**BINARY_OPERATORS, OpCode.DIV: checked_division(operator.floordiv)},
+    convert=operator.index,
+    symbols=SYMBOLS_WITHOUT_DIV,
+    exact=True,
+)
+
+# Точні раціональні числа
+FRACTION_MODE = NumericMode(
+    "fraction",
+    {**BINARY_OPERATORS, OpCode.DIV: checked_division(operator.truediv)},
+    convert=Fraction,
+    symbols=SYMBOLS_WITHOUT_DIV,
+    exact=True,
+)
+
+NUMERIC_MODES = {
+    "float": FLOAT_MODE,
+    "int": INT_MODE,
+    "fraction": FRACTION_MODE,
+    "decimal": NumericMode.decimal(),
+}
+
+
+def get_numeric_mode(mode):
+    """Приймаємо екземпляр `NumericMode` або назву режиму."""
+    if isinstance(mode, NumericMode):
+        return mode
+    try:
+        return NUMERIC_MODES[mode]
+    except KeyError:
+        raise ValueError(f"Невідомий числовий режим: {mode}") from None
+
+
+def iter_postorder(tree):
+    """Обходимо дерево у зворотному порядку (діти, потім вузол) без рекурсії."""
+    stack = [(tree, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if children_done or not isinstance(node, BinOp):
+            yield node
+        else:
+            stack.append((node, True))
+            stack.append((node.right, False))
+            stack.append((node.left, False))
+
+
+# Цілі константи з модулем, меншим за цю межу, вписуються в згенерований код
+SMALL_INT_LIMIT = 2**63
+
+
+class CompiledExpression:
+    """
+    Скомпільований вираз: плаский байткод стекової машини та згенерована
+    з нього Python-функція, яку можна викликати багато разів без повторного
+    розбору тексту.
+    """
+
+    def __init__(self, code, mode="float", names=None):
+        self.code = tuple(code)
+        self.mode = get_numeric_mode(mode)
+        # Імена змінних у порядку першої появи - це порядок аргументів функції.
+        # `names` може містити й змінні, яких у коді вже немає (x*0 -> 0)
+        loaded = (arg for opcode, arg in self.code if opcode == OpCode.LOAD_NAME)
+        self.names = tuple(dict.fromkeys((*(names or ()), *loaded)))
+        # Генерація code object коштує дорожче за кілька обчислень на стековій
+        # машині: перший виклик виконуємо нею, а функцію будуємо на другому
+        self._function = self._execute_first_call
+
+    def __call__(self, **variables):
+        if not self.names:
+            return self._function()
+        return self._function(*self._arguments(variables))
+
+    def _arguments(self, variables):
+        try:
+            args = [variables[name] for name in self.names]
+        except KeyError as e:
+            raise NameError(f"Невідома змінна: {e.args[0]}") from None
+        if self.mode.convert is not None:
+            args = list(map(self.mode.convert, args))
+        return args
+
+    def _execute_first_call(self, *args):
+        self._function = self._build_on_first_call
+        return self._run(args)
+
+    def _build_on_first_call(self, *args):
+        self._function = self._build_function()
+        return self._function(*args)
+
+    def execute(self, **variables):
+        """Виконуємо байткод на стековій машині."""
+        # Усі змінні перевіряємо й перетворюємо наперед, як і виклик функції
+        return self._run(self._arguments(variables))
+
+    def _run(self, args, code=None):
+        # `code` - ті самі інструкції з іншого джерела (профілювання їх рахує)
+        variables = dict(zip(self.names, args))
+        stack = []
+        temps = {}
+        push = stack.append
+        pop = stack.pop
+        operators = self.mode.operators
+        for opcode, arg in self.code if code is None else code:
+            if opcode == OpCode.PUSH_CONST:
+                push(arg)
+            elif opcode == OpCode.LOAD_NAME:
+                push(variables[arg])
+            elif opcode == OpCode.STORE_TEMP:
+                temps[arg] = stack[-1]
+            elif opcode == OpCode.LOAD_TEMP:
+                push(temps[arg])
+            else:
+                right = pop()
+                push(operators[opcode](pop(), right))
+        return pop()
+
+    def _build_function(self):
+        """
+        Перетворюємо байткод на лінійну послідовність присвоєнь і компілюємо
+        її в code object. Лінійна форма не має вкладених дужок, тому не впирається
+        в обмеження вкладеності компілятора Python.
+        """
+        namespace = {}
+        lines = []
+        stack = []
+        temps = {}
+        constants = []
+        symbols = self.mode.symbols
+        # Операції без оператора Python (decimal з контекстом, ділення у
+        # fraction) викликаються як функції
+        namespace.update(
+            (f"_{opcode}", function)
+            for opcode, function in self.mode.operators.items()
+            if opcode not in symbols
+        )
+        # Змінні стають позиційними параметрами _v0, _v1, ... - так ім'я
+        # змінної ніколи не конфліктує з ключовими словами Python
+        params = {name: f"_v{index}" for index, name in enumerate(self.names)}
+        for opcode, arg in self.code:
+            if opcode == OpCode.LOAD_NAME:
+                stack.append(params[arg])
+            elif opcode == OpCode.PUSH_CONST:
+                # Малі цілі вписуємо в код як літерали; великі (як і решту типів)
+                # передаємо через простір імен - repr() цілого з понад 4300
+                # цифрами падає на обмеженні перетворення int -> str
+                if type(arg) is int and -SMALL_INT_LIMIT < arg < SMALL_INT_LIMIT:
+                    stack.append(repr(arg))
+                else:
+                    name = f"_k{len(constants)}"
+                    constants.append(arg)
+                    namespace[name] = arg
+                    stack.append(name)
+            elif opcode == OpCode.STORE_TEMP:
+                # Результат операції вже лежить у локальній змінній - просто
+                # запам'ятовуємо її ім'я для наступних LOAD_TEMP
+                temps[arg] = stack[-1]
+            elif opcode == OpCode.LOAD_TEMP:
+                stack.append(temps[arg])
+            else:
+                right = stack.pop()
+                left = stack.pop()
+                name = f"_t{len(lines)}"
+                if opcode not in symbols:
+                    lines.append(f"    {name} = _{opcode}({left}, {right})")
+                else:
+                    lines.append(f"    {name} = {left} {symbols[opcode]} {right}")
+                stack.append(name)
+        lines.append(f"    return {stack.pop()}")
+        source = f"def _expression({', '.join(params.values())}):\n" + "\n".join(lines) + "\n"
+        exec(compile(source, "<expression>", "exec"), namespace)
+        return namespace["_expression"]
+
+
+class Compiler:
+    """Перетворює AST, побудоване `Parser.expr()`, у байткод стекової машини."""
+
+    def __init__(self, mode="float"):
+        self.mode = get_numeric_mode(mode)
+
+    def compile(self, tree, names=None):
+        """
+        Дерево може бути DAG після `optimize`: спільний вузол обчислюється
+        один раз (STORE_TEMP), а далі його значення береться з LOAD_TEMP.
+        `names` - змінні вихідного виразу, якщо оптимізація частину з них прибрала.
+        """
+        shared = shared_nodes(tree)
+        convert = self.mode.convert
+        temps = {}
+        code = []
+        stack = [(tree, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if id(node) in temps:
+                code.append((OpCode.LOAD_TEMP, temps[id(node)]))
+            elif isinstance(node, Num):
+                value = node.value if convert is None else convert(node.value)
+                code.append((OpCode.PUSH_CONST, value))
+            elif isinstance(node, Var):
+                code.append((OpCode.LOAD_NAME, node.name))
+            elif isinstance(node, BinOp):
+                if not children_done:
+                    stack.append((node, True))
+                    stack.append((node.right, False))
+                    stack.append((node.left, False))
+                    continue
+                code.append((BINARY_OPCODES[node.op.type], None))
+                if id(node) in shared:
+                    temps[id(node)] = len(temps)
+                    code.append((OpCode.STORE_TEMP, temps[id(node)]))
+            else:
+                raise Exception(f"Немає правила компіляції для {type(node).__name__}")
+        return CompiledExpression(code, self.mode, names)
+
+
+def shared_nodes(tree):
+    """Повертаємо id вузлів BinOp, на які посилається більше одного батька."""
+    parents = {}
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, BinOp):
+            for child in (node.left, node.right):
+                count = parents.get(id(child), 0)
+                parents[id(child)] = count + 1
+                if count == 0:
+                    stack.append(child)
+    return {key for key, count in parents.items() if count > 1}
+
+
+def variable_names(tree):
+    """Імена змінних дерева в порядку першої появи зліва направо."""
+    return tuple(
+        dict.fromkeys(node.name for node in iter_postorder(tree) if isinstance(node, Var))
+    )
+
+
+def count_nodes(tree):
+    """Рахуємо різні вузли дерева (спільний вузол DAG рахується один раз)."""
+    seen = set()
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        if isinstance(node, BinOp):
+            stack.append(node.left)
+            stack.append(node.right)
+    return len(seen)
+
+
+def _has_division(node, divisions):
+    return isinstance(node, BinOp) and divisions[id(node)]
+
+
+def _simplify(node, left, right, divisions, mode):
+    """Згортаємо константи та застосовуємо тотожності x+0, x-0, x*1, x*0."""
+    op = node.op.type
+    left_value = left.value if isinstance(left, Num) else None
+    right_value = right.value if isinstance(right, Num) else None
+    if mode.convert is not None:
+        left_value = None if left_value is None else mode.convert(left_value)
+        right_value = None if right_value is None else mode.convert(right_value)
+
+    if left_value is not None and right_value is not None:
+        # Ділення на нуль не згортаємо: помилка має виникнути під час обчислення
+        if not (op == TokenType.DIV and right_value == 0):
+            value = mode.operators[BINARY_OPCODES[op]](left_value, right_value)
+            return Num(Token(TokenType.INTEGER, value))
+
+    # У режимах float і decimal тотожності x-0 і x*1 застосовуємо лише до цілих
+    # констант, щоб не змінити тип результату (x - 0.0 для цілого x дає float).
+    # x+0 і x*0 там не спрощуємо зовсім: -0.0 + 0 дає 0.0, а x*0 залежно від x
+    # дає 0, -0.0, nan або помилку (Decimal("Infinity") * 0); до того ж
+    # ділення, вже згорнуте в константу, _has_division не бачить
+    left_int = left_value is not None and (mode.exact or type(left_value) is int)
+    right_int = right_value is not None and (mode.exact or type(right_value) is int)
+    if op == TokenType.PLUS:
+        if mode.exact:
+            if right_value == 0:
+                return left
+            if left_value == 0:
+                return right
+    elif op == TokenType.MINUS:
+        if right_int and right_value == 0:
+            return left
+    elif op == TokenType.MUL:
+        if right_int and right_value == 1:
+            return left
+        if left_int and left_value == 1:
+            return right
+        # x*0 -> 0, лише якщо x не містить ділення (яке могло б бути на нуль)
+        if mode.exact:
+            if right_value == 0 and not _has_division(left, divisions):
+                return right
+            if left_value == 0 and not _has_division(right, divisions):
+                return left
+
+    if left is node.left and right is node.right:
+        return node
+    return BinOp(left=left, op=node.op, right=right)
+
+
+def optimize(tree, mode="float"):
+    """
+    Оптимізуємо AST: згортаємо константні піддерева, застосовуємо алгебраїчні
+    тотожності та об'єднуємо однакові підвирази (CSE). Однакові піддерева
+    стають одним спільним вузлом, тому результат - DAG, який `Compiler`
+    обчислює без повторів. Константи згортаються за правилами числового
+    режиму `mode`. Вихідне дерево не змінюється.
+    """
+    mode = get_numeric_mode(mode)
+    canonical = {}  # структурний ключ -> єдиний екземпляр вузла
+    divisions = {}  # id(вузла BinOp) -> чи є ділення в піддереві
+    optimized = {}  # id(вихідного вузла) -> оптимізований вузол
+    for original in iter_postorder(tree):
+        node = original
+        if isinstance(original, BinOp):
+            left = optimized[id(original.left)]
+            right = optimized[id(original.right)]
+            node = _simplify(original, left, right, divisions, mode)
+
+        if isinstance(node, Num):
+            # -0.0 == 0.0 і Decimal("0.0") == Decimal("0"), тож нецілі константи
+            # розрізняємо за записом
+            value = node.value
+            key = ("Num", type(value), value if type(value) is int else str(value))
+        elif isinstance(node, Var):
+            key = ("Var", node.name)
+        else:
+            key = (node.op.type, id(node.left), id(node.right))
+        node = canonical.setdefault(key, node)
+        if isinstance(node, BinOp) and id(node) not in divisions:
+            divisions[id(node)] = (
+                node.op.type == TokenType.DIV
+                or _has_division(node.left, divisions)
+                or _has_division(node.right, divisions)
+            )
+        optimized[id(original)] = node
+    return optimized[id(tree)]
+
+
+def compile_expression(text, optimized=True, mode="float"):
+    """Розбираємо текст один раз і повертаємо скомпільований вираз."""
+    tree = IterativeParser(RegexLexer(text)).expr()
+    # Змінні беремо з вихідного дерева: x*0 -> 0 прибирає x з коду, але
+    # значення x однаково обов'язкове і перевіряється режимом
+    names = variable_names(tree)
+    if optimized:
+        tree = optimize(tree, mode)
+    return Compiler(mode).compile(tree, names)
+
+
+class ExpressionCache:
+    """
+    Обмежений LRU-кеш: нормалізований текст виразу -> скомпільований вираз,
+    а для виразів без змінних - готове значення. Повторний вираз
+    не проходить ні через лексер, ні через парсер.
+
+    Вираз без змінних при першій появі лише обчислюється ітеративним
+    інтерпретатором: optimize і компіляція коштують дорожче за саме обчислення,
+    а значення однаково береться з кешу. Компілюється він, тільки якщо
+    скомпільований вираз запросили через `compile`.
+    """
+
+    def __init__(self, capacity=1024, mode="float", profile=None):
+        if capacity < 1:
+            raise ValueError("Місткість кешу має бути додатною")
+        self.capacity = capacity
+        self.mode = get_numeric_mode(mode)
+        # PhaseStats: промахи та обчислення цього кешу вимірюються по фазах
+        self.profile = profile
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def normalize(text):
+        """Прибираємо пробіли на краях і зводимо внутрішні до одного."""
+        return " ".join(text.split())
+
+    def _lookup(self, text):
+        """Повертаємо запис [скомпільований вираз, значення або None]."""
+        key = self.normalize(text)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            if self.profile is not None:
+                self.profile.cache_hits += 1
+            return entry
+
+        self.misses += 1
+        if self.profile is not None:
+            entry = profile_entry(key, self.mode, self.profile)
+        elif NAME_START_PATTERN.search(key) is None:
+            # Помилка обчислення (напр. ділення на нуль) вилетить тут, і такий
+            # вираз у кеш не потрапить
+            tree = IterativeParser(RegexLexer(key)).expr()
+            entry = [None, IterativeInterpreter(None, mode=self.mode).visit(tree)]
+        else:
+            entry = [compile_expression(key, mode=self.mode), None]
+        self._entries[key] = entry
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def compile(self, text):
+        entry = self._lookup(text)
+        if entry[0] is None:
+            entry[0] = compile_expression(self.normalize(text), mode=self.mode)
+        return entry[0]
+
+    def evaluate(self, text, **variables):
+        if self.profile is not None:
+            return self._profile_evaluate(text, variables)
+        compiled, value = self._lookup(text)
+        if value is not None:
+            return value
+        return compiled(**variables)
+
+    def _profile_evaluate(self, text, variables):
+        stats = self.profile
+        stats.expressions += 1
+        try:
+            compiled, value = self._lookup(text)
+            if value is not None:
+                return value
+            return profile_call(compiled, variables, stats)
+        except Exception:
+            stats.errors += 1
+            raise
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode.name,
+            "capacity": self.capacity,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+expression_cache = ExpressionCache()
+
+
+def use_numeric_mode(mode, precision=None):
+    """
+    Перемикаємо модульний кеш (а отже main() і evaluate_stream) на інший
+    числовий режим; `precision` задає точність для режиму decimal.
+    """
+    global expression_cache
+    if mode == "decimal" and precision:
+        mode = NumericMode.decimal(decimal.Context(prec=precision))
+    expression_cache = ExpressionCache(expression_cache.capacity, mode)
+
+
+def evaluate_batch(expr, **columns):
+    """
+    Обчислюємо вираз для кожного рядка стовпців за один виклик.
+
+    Вираз розбирається один раз. Стовпці - це NumPy-масиви, `array.array`
+    або будь-які послідовності однакової довжини. Якщо NumPy встановлено,
+    дерево обчислюється векторизовано над масивами і результатом є
+    `numpy.ndarray`; інакше вираз виконується по рядках і повертається список.
+    Для режимів з перетворенням значень (int, fraction, decimal) вираз
+    обчислюється по рядках: цілі Python не переповнюються, на відміну від int64.
+    """
+    compiled = expression_cache.compile(expr)
+    missing = [name for name in compiled.names if name not in columns]
+    if missing:
+        raise NameError(f"Невідома змінна: {missing[0]}")
+    sizes = {len(column) for column in columns.values()}
+    if len(sizes) > 1:
+        raise ValueError("Стовпці мають різну довжину")
+    size = sizes.pop() if sizes else 1
+
+    convert = compiled.mode.convert
+    if np is not None and convert is None:
+        arrays = {name: np.asarray(columns[name]) for name in compiled.names}
+        # Байткод над масивами: на кожну операцію - одна векторна операція NumPy,
+        # а ділення перевіряє дільники (checked_array_division)
+        operators = compiled.mode.operators
+        mode = NumericMode(
+            compiled.mode.name,
+            {**operators, OpCode.DIV: checked_array_division(operators[OpCode.DIV])},
+        )
+        # inf - inf чи inf * 0 дають nan без попереджень, як і по рядках
+        with np.errstate(divide="raise", over="ignore", invalid="ignore"):
+            try:
+                result = CompiledExpression(compiled.code, mode, compiled.names).execute(**arrays)
+            except FloatingPointError:
+                raise ZeroDivisionError("division by zero") from None
+        if np.ndim(result) == 0:
+            # Вираз без змінних (або спрощений до константи) - по значенню на рядок
+            result = np.full(size, result)
+        return result
+
+    if not compiled.names:
+        return [compiled()] * size
+    ordered = [columns[name] for name in compiled.names]
+    if convert is not None:
+        ordered = [map(convert, column) for column in ordered]
+    return list(map(compiled._function, *ordered))
+
+
+def evaluate_lines(lines):
+    """
+    Обчислюємо пачку виразів у процесі-воркері. Для кожного рядка повертаємо
+    (True, результат) або (False, текст помилки); результат одразу перетворюємо
+    на рядок, щоб не передавати між процесами великі числа.
+    """
+    results = []
+    for line in lines:
+        try:
+            results.append((True, str(expression_cache.evaluate(line))))
+        except Exception as e:
+            results.append((False, str(e) or type(e).__name__))
+    return results
+
+
+def evaluate_stream(
+    source, target, workers=None, chunk_size=10_000, log=sys.stderr, mode="float", precision=None
+):
+    """
+    Потоково обчислюємо файл виразів (по одному на рядок) у пулі процесів.
+
+    Рядки діляться на пачки по `chunk_size` і обробляються паралельно, але
+    результати записуються в `target` у порядку вхідних рядків. У роботі
+    одночасно не більше двох пачок на воркер, тож пам'ять не залежить від
+    розміру вхідного файлу. Помилки записуються у вихід як "ERROR: ..." і
+    в `log` з номером рядка. `mode` і `precision` - як у `use_numeric_mode`.
+    Повертаємо словник зі статистикою.
+    """
+    workers = workers or os.cpu_count() or 1
+    lines = (line.rstrip("\n") for line in source)
+    chunks = iter(lambda: list(islice(lines, chunk_size)), [])
+    total = failed = 0
+    start_time = time.perf_counter()
+
+    def write(results):
+        nonlocal total, failed
+        output = []
+        for ok, value in results:
+            total += 1
+            if ok:
+                output.append(value)
+            else:
+                failed += 1
+                output.append(f"ERROR: {value}")
+                print(f"Рядок {total}: {value}", file=log)
+        target.write("\n".join(output) + "\n")
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=use_numeric_mode, initargs=(mode, precision)
+    ) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(evaluate_lines, chunk))
+            if len(pending) >= workers * 2:
+                write(pending.popleft().result())
+        while pending:
+            write(pending.popleft().result())
+
+    elapsed = time.perf_counter() - start_time
+    stats = {
+        "lines": total,
+        "errors": failed,
+        "seconds": elapsed,
+        "lines_per_second": total / elapsed if elapsed else 0.0,
+    }
+    print(
+        f"Оброблено {total:,} виразів ({failed:,} з помилками) за {elapsed:.2f} сек: "
+        f"{stats['lines_per_second']:,.0f} виразів/сек, воркерів: {workers}",
+        file=log,
+    )
+    return stats
+
+
+class PhaseStats:
+    """
+    Накопичена статистика того шляху, яким вирази обчислюють main() та
+    evaluate_stream (через ExpressionCache): RegexLexer -> IterativeParser ->
+    optimize -> Compiler -> обчислення. Вирази без змінних після парсера
+    одразу обчислює IterativeInterpreter, а влучання в кеш не проходять
+    жодної фази. `visits` рахуються під час обчислення: вузли, відвідані
+    інтерпретатором, та інструкції, виконані скомпільованим виразом.
+    """
+
+    PHASES = ("lexer", "parser", "optimize", "compiler", "evaluate")
+
+    def __init__(self):
+        self.expressions = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.tokens = 0
+        self.nodes = 0
+        self.instructions = 0
+        self.visits = 0
+        self.seconds = dict.fromkeys(self.PHASES, 0.0)
+
+    def to_dict(self):
+        total = sum(self.seconds.values())
+        return {
+            "expressions": self.expressions,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "tokens": self.tokens,
+            "nodes": self.nodes,
+            "instructions": self.instructions,
+            "visits": self.visits,
+            "total_seconds": total,
+            "phases": {
+                phase: {
+                    "seconds": seconds,
+                    "share": seconds / total if total else 0.0,
+                }
+                for phase, seconds in self.seconds.items()
+            },
+        }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def dump(self, file):
+        file.write(self.to_json() + "\n")
+
+
+def counted(items, stats):
+    """Видаємо `items` як є і додаємо їх кількість до `stats.visits`."""
+    count = 0
+    try:
+        for item in items:
+            count += 1
+            yield item
+    finally:
+        stats.visits += count
+
+
+def profile_entry(key, mode, stats):
+    """
+    Будуємо запис кешу для `key` тим самим шляхом, що й ExpressionCache._lookup,
+    вимірюючи кожну фазу. Токени збираються в список окремо від парсера, тож
+    час лексера не змішується з часом парсера.
+    """
+    start_time = time.perf_counter()
+    tokens = tokenize(key)
+    lexed_time = time.perf_counter()
+    stats.seconds["lexer"] += lexed_time - start_time
+    stats.tokens += len(tokens)
+
+    tree = IterativeParser(TokenStream(tokens)).expr()
+    parsed_time = time.perf_counter()
+    stats.seconds["parser"] += parsed_time - lexed_time
+    stats.nodes += count_nodes(tree)
+
+    if NAME_START_PATTERN.search(key) is None:
+        start_time = time.perf_counter()
+        try:
+            value = IterativeInterpreter(None, mode=mode).evaluate(
+                counted(iter_postorder(tree), stats)
+            )
+        finally:
+            stats.seconds["evaluate"] += time.perf_counter() - start_time
+        return [None, value]
+
+    start_time = time.perf_counter()
+    names = variable_names(tree)
+    tree = optimize(tree, mode)
+    optimized_time = time.perf_counter()
+    stats.seconds["optimize"] += optimized_time - start_time
+    compiled = Compiler(mode).compile(tree, names)
+    stats.seconds["compiler"] += time.perf_counter() - optimized_time
+    stats.instructions += len(compiled.code)
+    return [compiled, None]
+
+
+def profile_call(compiled, variables, stats):
+    """
+    Викликаємо скомпільований вираз так само, як `CompiledExpression()`:
+    перший виклик - на стековій машині, далі - згенерованим code object
+    (його генерація додається до фази compiler). Згенерований код лінійний,
+    тож успішний виклик виконує кожну інструкцію рівно один раз.
+    """
+    args = compiled._arguments(variables)
+    if compiled._function == compiled._build_on_first_call:
+        start_time = time.perf_counter()
+        compiled._function = compiled._build_function()
+        stats.seconds["compiler"] += time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    try:
+        if compiled._function == compiled._execute_first_call:
+            compiled._function = compiled._build_on_first_call
+            return compiled._run(args, counted(compiled.code, stats))
+        result = compiled._function(*args)
+        stats.visits += len(compiled.code)
+        return result
+    finally:
+        stats.seconds["evaluate"] += time.perf_counter() - start_time
+
+
+def profile_expression(text, stats, variables=None, mode="float"):
+    """
+    Обчислюємо вираз шляхом промаху кешу, вимірюючи кожну фазу, і додаємо
+    дані в `stats`. Звичайні шляхи (main, кеш, evaluate_stream) без
+    профілювання цього не роблять, тож накладних витрат у них немає.
+    """
+    cache = ExpressionCache(capacity=1, mode=mode, profile=stats)
+    return cache.evaluate(text, **(variables or {}))
+
+
+def profile_stream(source, target, stats, mode="float", log=sys.stderr):
+    """Послідовний варіант `evaluate_stream` з профілюванням (кеш, як у воркера)."""
+    cache = ExpressionCache(expression_cache.capacity, mode, profile=stats)
+    for number, line in enumerate(source, start=1):
+        text = line.rstrip("\n")
+        try:
+            target.write(f"{cache.evaluate(text)}\n")
+        except Exception as e:
+            message = str(e) or type(e).__name__
+            target.write(f"ERROR: {message}\n")
+            print(f"Рядок {number}: {message}", file=log)
+    return stats
+
+
+def main(stats=None):
+    cache = expression_cache
+    if stats is not None:
+        cache = ExpressionCache(expression_cache.capacity, expression_cache.mode, profile=stats)
     while True:
         try:
             text = input('Введіть вираз (або "exit" для виходу): ')
             if text.lower() == "exit":
                 print("Вихід із програми.")
                 break
-            lexer = Lexer(text)
-            parser = Parser(lexer)
-            interpreter = Interpreter(parser)
-            result = interpreter.interpret()
-            print(result)
+            print(cache.evaluate(text))
         except Exception as e:
             print(e)
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Калькулятор арифметичних виразів")
+    parser.add_argument(
+        "input",
+        nargs="?",
+        help="файл з виразами, по одному на рядок ('-' - stdin); без нього - інтерактивний режим",
+    )
+    parser.add_argument("-o", "--output", default="-", help="файл для результатів ('-' - stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="кількість процесів")
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="рядків у пачці")
+    parser.add_argument(
+        "--mode", choices=sorted(NUMERIC_MODES), default="float", help="числовий режим"
+    )
+    parser.add_argument("--precision", type=int, default=None, help="точність для --mode decimal")
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="профілювати фази лексер/парсер/optimize/компілятор/обчислення "
+        "(в одному процесі) і записати статистику в JSON-файл ('-' - stderr)",
+    )
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    use_numeric_mode(args.mode, args.precision)
+    stats = PhaseStats() if args.profile else None
+    if args.input is None:
+        main(stats)
+    else:
+        source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+        target = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+        with source, target:
+            if stats is None:
+                evaluate_stream(
+                    source, target, args.workers, args.chunk_size, mode=args.mode, precision=args.precision
+                )
+            else:
+                profile_stream(source, target, stats, mode=expression_cache.mode)
+
+    if stats is not None:
+        if args.profile == "-":
+            stats.dump(sys.stderr)
+        else:
+            with open(args.profile, "w", encoding="utf-8") as file:
+                stats.dump(file)
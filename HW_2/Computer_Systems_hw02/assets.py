@@ -0,0 +1,101 @@
+import gzip
+import hashlib
+import mimetypes
+from pathlib import Path
+
+from fastapi import HTTPException, Request, Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Versioned URLs (?v=<hash>) never change content, so browsers may keep them for a year
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+def compress(body):
+    """Return the encodings that are actually smaller than the original body."""
+    variants = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=11)
+    return {name: data for name, data in variants.items() if len(data) < len(body)}
+
+
+def accepted_encodings(header):
+    encodings = set()
+    for item in header.split(","):
+        name, _, params = item.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                pass
+        if quality > 0:
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+def etag_matches(header, etag):
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+class Asset:
+    """A response body kept in memory with its compressed variants and ETags."""
+
+    def __init__(self, body, media_type):
+        self.media_type = media_type
+        self.version = hashlib.sha256(body).hexdigest()[:16]
+        # Each encoding is a different byte sequence, so it gets its own strong ETag
+        self.variants = {None: (body, f'"{self.version}"')}
+        for encoding, data in compress(body).items():
+            self.variants[encoding] = (data, f'"{self.version}-{encoding}"')
+
+    def select(self, request):
+        accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and encoding in accepted:
+                return encoding
+        return None
+
+    def response(self, request, cache_control=REVALIDATE):
+        encoding = self.select(request)
+        body, etag = self.variants[encoding]
+        headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if etag_matches(request.headers.get("if-none-match", ""), etag):
+            return Response(status_code=304, headers=headers)
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        return Response(body, media_type=self.media_type, headers=headers)
+
+
+class StaticAssets:
+    """Files of a directory, read and compressed once at startup and served from memory."""
+
+    def __init__(self, directory, prefix="/static"):
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.assets = {}
+
+    def load(self):
+        assets = {}
+        for path in sorted(self.directory.rglob("*")):
+            if path.is_file():
+                media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+                assets[path.relative_to(self.directory).as_posix()] = Asset(path.read_bytes(), media_type)
+        self.assets = assets
+
+    def url(self, path):
+        """URL with a content hash, which can be cached forever."""
+        return f"{self.prefix}/{path}?v={self.assets[path].version}"
+
+    def response(self, request: Request, path):
+        asset = self.assets.get(path)
+        if asset is None:
+            raise HTTPException(status_code=404, detail="Not Found")
+        versioned = request.query_params.get("v") == asset.version
+        return asset.response(request, IMMUTABLE if versioned else REVALIDATE)
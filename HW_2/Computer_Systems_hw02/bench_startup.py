@@ -0,0 +1,119 @@
+"""
+Startup time of the service.
+
+Measures `import main` with `python -X importtime` (median of several runs,
+each in a fresh interpreter) and the time from launching `python main.py`
+until the first response. Results are compared with startup_baseline.json,
+which is kept in the repository; the run fails when import time regresses
+by more than --tolerance:
+
+    python bench_startup.py            # compare with the baseline
+    python bench_startup.py --save     # record a new baseline
+
+Timings depend on the machine, so re-record the baseline when it changes.
+"""
+
+import argparse
+import json
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+BASELINE = BASE_DIR / "startup_baseline.json"
+
+
+def import_times():
+    """Cumulative import time in seconds per module for one fresh `import main`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    # Lines look like "import time:       208 |        589 |   brotli"
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative) / 1_000_000
+    return times
+
+
+def time_to_first_response(port, timeout=30.0):
+    start_time = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "main.py", "--workers", "1", "--port", str(port)],
+        cwd=BASE_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start_time < timeout:
+            try:
+                # The index page does not need the database
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1):
+                    return time.perf_counter() - start_time
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"no response in {timeout} seconds")
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def measure(runs, port):
+    samples = [import_times() for _ in range(runs)]
+    modules = {
+        name: statistics.median(sample.get(name, 0.0) for sample in samples) for name in samples[0]
+    }
+    return {
+        "import_main_s": modules["main"],
+        "first_response_s": statistics.median(time_to_first_response(port) for _ in range(runs)),
+        "slowest_imports_s": dict(
+            sorted(
+                ((name, seconds) for name, seconds in modules.items() if name != "main"),
+                key=lambda item: item[1],
+                reverse=True,
+            )[:15]
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--save", action="store_true", help="write the result as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed import time regression")
+    args = parser.parse_args()
+
+    result = measure(args.runs, args.port)
+    print(f"import main:          {result['import_main_s'] * 1000:8.1f} ms")
+    print(f"first response:       {result['first_response_s'] * 1000:8.1f} ms")
+    print("slowest imports (cumulative):")
+    for name, seconds in result["slowest_imports_s"].items():
+        print(f"  {name:<40} {seconds * 1000:8.1f} ms")
+
+    if args.save:
+        BASELINE.write_text(json.dumps(result, indent=2) + "\n")
+        print(f"Saved to {BASELINE.name}")
+        return
+    if not BASELINE.exists():
+        return
+    baseline = json.loads(BASELINE.read_text())
+    for key in ("import_main_s", "first_response_s"):
+        change = result[key] / baseline[key] - 1
+        print(f"{key}: {baseline[key] * 1000:.1f} ms -> {result[key] * 1000:.1f} ms ({change:+.0%})")
+    if result["import_main_s"] > baseline["import_main_s"] * (1 + args.tolerance):
+        sys.exit("import time regressed beyond the tolerance")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Throughput of the production launcher with different numbers of workers.
+
+Starts `python main.py --workers N` for every N, waits until it answers,
+runs load_test.py against it and stops it with SIGTERM (graceful shutdown):
+
+    python bench_workers.py --workers 1 2 4 --url /healthchecker --url /
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+from load_test import run
+
+BASE_DIR = Path(__file__).parent
+
+
+def wait_until_ready(url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"{url} did not answer in {timeout} seconds")
+
+
+def bench(workers, port, paths, concurrency, duration):
+    server = subprocess.Popen(
+        [sys.executable, "main.py", "--workers", str(workers), "--port", str(port)],
+        cwd=BASE_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_until_ready(base_url + paths[0])
+        return [asyncio.run(run(base_url + path, concurrency, duration)) for path in paths]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker scaling benchmark")
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2, os.cpu_count() or 1], help="worker counts to try"
+    )
+    parser.add_argument("--url", action="append", help="path to load (repeatable), default /healthchecker")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per path")
+    args = parser.parse_args()
+    paths = args.url or ["/healthchecker"]
+
+    print(f"{'workers':>7} {'path':<20} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    baseline = {}
+    for workers in sorted(set(args.workers)):
+        for path, result in zip(paths, bench(workers, args.port, paths, args.concurrency, args.duration)):
+            baseline.setdefault(path, result["rps"])
+            print(
+                f"{workers:>7} {path:<20} {result['requests']:>9} {result['errors']:>7} "
+                f"{result['rps']:>9.1f} {result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f}"
+                f"  x{result['rps'] / baseline[path]:.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
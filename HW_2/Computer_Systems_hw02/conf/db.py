@@ -1,20 +1,133 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+import os
 
-SQLALCHEMY_DATABASE_URL = f"postgresql+psycopg2://postgres:postgres@db/hw02"
+# SQLAlchemy and the DB drivers are imported only when the engines are created
+# (in the app lifespan), so importing this module stays cheap
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, echo=True, max_overflow=5)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SQLALCHEMY_DATABASE_URL = os.environ.get(
+    "DATABASE_URL", "postgresql+psycopg2://postgres:postgres@db/hw02"
+)
 
+# Async drivers for the same databases: asyncpg for PostgreSQL,
+# aiosqlite for local testing with SQLite
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
 
-class Base(DeclarativeBase):
-    pass
+
+def backend_name(url):
+    # "postgresql+psycopg2://..." -> "postgresql"
+    return str(url).split("://", 1)[0].split("+", 1)[0]
+
+
+def to_async_url(url):
+    rest = str(url).split("://", 1)[1]
+    return f"{ASYNC_DRIVERS[backend_name(url)]}://{rest}"
+
+
+ASYNC_SQLALCHEMY_DATABASE_URL = os.environ.get("ASYNC_DATABASE_URL") or to_async_url(
+    SQLALCHEMY_DATABASE_URL
+)
+
+
+def env_flag(name, default):
+    return os.environ.get(name, default).lower() in ("1", "true", "yes", "on")
+
+
+# Pool settings, per engine (each worker process has its own pools)
+DB_ECHO = env_flag("DB_ECHO", "false")
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 5))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = env_flag("DB_POOL_PRE_PING", "true")
+
+
+def pool_options(url, poolclass):
+    # SQLite (aiosqlite) runs on NullPool, which takes no pool-size arguments
+    if backend_name(url) == "sqlite":
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+# engine, SessionLocal, async_engine and AsyncSessionLocal, once created
+_engines = {}
+
+
+def init_engines():
+    """Create both engines and their session factories if they do not exist yet."""
+    if _engines:
+        return
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from conf.pools import TimedAsyncQueuePool, TimedQueuePool
+
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        echo=DB_ECHO,
+        **pool_options(SQLALCHEMY_DATABASE_URL, TimedQueuePool),
+    )
+    async_engine = create_async_engine(
+        ASYNC_SQLALCHEMY_DATABASE_URL,
+        echo=DB_ECHO,
+        **pool_options(ASYNC_SQLALCHEMY_DATABASE_URL, TimedAsyncQueuePool),
+    )
+    _engines.update(
+        engine=engine,
+        SessionLocal=sessionmaker(autocommit=False, autoflush=False, bind=engine),
+        async_engine=async_engine,
+        AsyncSessionLocal=async_sessionmaker(
+            async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        ),
+    )
+
+
+async def dispose_engines():
+    """Close pooled connections; the engines are created again on next use."""
+    if not _engines:
+        return
+    await _engines["async_engine"].dispose()
+    _engines["engine"].dispose()
+    _engines.clear()
+
+
+def __getattr__(name):
+    # `from conf.db import engine` etc. still work and create the engines on first use
+    global Base
+    if name in ("engine", "SessionLocal", "async_engine", "AsyncSessionLocal"):
+        init_engines()
+        return _engines[name]
+    if name == "Base":
+        from sqlalchemy.orm import DeclarativeBase
+
+        class Base(DeclarativeBase):
+            pass
+
+        return Base
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # Dependency
 def get_db():
-    db = SessionLocal()
+    init_engines()
+    db = _engines["SessionLocal"]()
     try:
         yield db
     finally:
         db.close()
+
+
+# Async dependency: does not occupy a threadpool worker while waiting for the DB
+async def get_async_db():
+    init_engines()
+    async with _engines["AsyncSessionLocal"]() as db:
+        yield db
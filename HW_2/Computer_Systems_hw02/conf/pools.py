@@ -0,0 +1,71 @@
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from conf.db import DB_MAX_OVERFLOW
+
+
+class PoolWaitStats:
+    """How long checkouts waited for a free connection."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds):
+        self.checkouts += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def to_dict(self):
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "total_ms": round(self.total_seconds * 1000, 3),
+            "avg_ms": round(self.total_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 3),
+        }
+
+
+class TimedPoolMixin:
+    # Class-level so the stats survive engine.dispose(), which recreates the pool
+    wait_stats = None
+
+    def _do_get(self):
+        start_time = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.wait_stats.timeouts += 1
+            raise
+        finally:
+            self.wait_stats.record(time.perf_counter() - start_time)
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    wait_stats = PoolWaitStats()
+
+
+class TimedAsyncQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    wait_stats = PoolWaitStats()
+
+
+def pool_metrics(engine):
+    """Current pool usage and checkout wait times for an engine."""
+    pool = engine.pool
+    metrics = {"pool": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        metrics.update(
+            size=pool.size(),
+            max_overflow=DB_MAX_OVERFLOW,
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            # QueuePool counts overflow from -pool_size until the pool is full
+            overflow=max(pool.overflow(), 0),
+        )
+    if isinstance(pool, TimedPoolMixin):
+        metrics["wait"] = pool.wait_stats.to_dict()
+    return metrics
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import time
+
+from conf import db
+
+# Background probe period, how long a probe result is served from memory,
+# the minimum gap between probes forced with ?fresh=1, and the probe timeout
+HEALTH_CHECK_INTERVAL = float(os.environ.get("HEALTH_CHECK_INTERVAL", 5))
+HEALTH_CHECK_TTL = float(os.environ.get("HEALTH_CHECK_TTL", 10))
+HEALTH_CHECK_MIN_INTERVAL = float(os.environ.get("HEALTH_CHECK_MIN_INTERVAL", 1))
+HEALTH_CHECK_TIMEOUT = float(os.environ.get("HEALTH_CHECK_TIMEOUT", 2))
+
+
+class HealthStatus:
+    """Last result of the database probe, refreshed by a background task."""
+
+    def __init__(self, interval, ttl, min_interval, timeout):
+        self.interval = interval
+        self.ttl = ttl
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self.ok = False
+        self.error = "Database has not been checked yet"
+        self.latency = None
+        self.checked_at = None
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    def age(self):
+        if self.checked_at is None:
+            return None
+        return time.monotonic() - self.checked_at
+
+    async def _select_one(self):
+        from sqlalchemy import text
+
+        async with db.AsyncSessionLocal() as session:
+            result = await session.execute(text("SELECT 1"))
+            return result.fetchone()
+
+    async def refresh(self, max_age=0.0):
+        """
+        Probe the database unless a result younger than `max_age` seconds
+        exists. Concurrent callers wait for the probe in progress and reuse
+        its result instead of sending their own query.
+        """
+        async with self._lock:
+            age = self.age()
+            if age is not None and age < max_age:
+                return
+            start_time = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(self._select_one(), self.timeout)
+                if result is None:
+                    self.ok, self.error = False, "Database is not configured correctly"
+                else:
+                    self.ok, self.error = True, None
+            except Exception as e:
+                print(e)
+                self.ok, self.error = False, "Error connecting to the database"
+            self.latency = time.perf_counter() - start_time
+            self.checked_at = time.monotonic()
+
+    async def get(self, fresh=False):
+        """Return the cached status, probing only if it is stale or `fresh` is requested."""
+        if fresh:
+            await self.refresh(self.min_interval)
+        elif self.checked_at is None or self.age() > self.ttl:
+            await self.refresh(self.ttl)
+        return self
+
+    async def _run(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+health_status = HealthStatus(
+    HEALTH_CHECK_INTERVAL, HEALTH_CHECK_TTL, HEALTH_CHECK_MIN_INTERVAL, HEALTH_CHECK_TIMEOUT
+)
@@ -1,45 +1,141 @@
+import argparse
+import importlib.util
 import os
+import tempfile
+from contextlib import asynccontextmanager
 from pathlib import Path
-import uvicorn
-from fastapi import FastAPI, Depends, HTTPException, Request, status
-from fastapi.responses import JSONResponse, HTMLResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from sqlalchemy import text
-from sqlalchemy.orm import Session
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, HTMLResponse, PlainTextResponse
 
-from conf.db import get_db
+from assets import Asset, StaticAssets
+from conf import db
+from health import health_status
+from metrics import MetricsMiddleware, metrics, reset_metrics_directory
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Engines (and with them SQLAlchemy and the DB drivers) are created here rather
+    # than on import, so the supervisor process and tooling that imports main stay fast
+    db.init_engines()
+    metrics.instrument_engine("async", db.async_engine.sync_engine)
+    metrics.instrument_engine("sync", db.engine)
+    # Read, hash and compress static files once, then render the index page with
+    # their versioned URLs; both are served from memory afterwards
+    static_assets.load()
+    app.state.index_page = render_index()
+    # Probe the DB in the background so health checks are served from memory
+    health_status.start()
+    # With several workers, publish this worker's metrics for the /metrics merge
+    metrics.start()
+    yield
+    await metrics.stop()
+    await health_status.stop()
+    # Close pooled connections so the database sees a clean disconnect on shutdown
+    await db.dispose_engines()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware, metrics=metrics)
 
 BASE_DIR = Path(__file__).parent
 directory = BASE_DIR.joinpath("static")
-app.mount("/static", StaticFiles(directory=directory), name="static")
-templates = Jinja2Templates(directory=BASE_DIR / "templates")
+static_assets = StaticAssets(directory)
+
+
+def render_index():
+    # Jinja2 is needed only here, at startup
+    from fastapi.templating import Jinja2Templates
+
+    templates = Jinja2Templates(directory=BASE_DIR / "templates")
+    templates.env.globals["static_url"] = static_assets.url
+    # The page does not depend on the request, so it is rendered once
+    html = templates.get_template("index.html").render(our="Build group WebPython #16")
+    return Asset(html.encode(), "text/html")
 
 
 @app.get("/", response_class=HTMLResponse)
-def index(request: Request):
-    return templates.TemplateResponse(
-        "index.html", {"request": request, "our": "Build group WebPython #16"}
-    )
+async def index(request: Request):
+    return request.app.state.index_page.response(request)
+
+
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def static(request: Request, path: str):
+    return static_assets.response(request, path)
 
 
 @app.get("/healthchecker")
-def healthchecker(db: Session = Depends(get_db)):
-    try:
-        # Make request
-        result = db.execute(text("SELECT 1"))
-        result = result.fetchone()
-        if result is None:
-            raise HTTPException(
-                status_code=500, detail="Database is not configured correctly"
-            )
-        return {"message": "Welcome to FastAPI!"}
-    except Exception as e:
-        print(e)
-        raise HTTPException(status_code=500, detail="Error connecting to the database")
+async def healthchecker(fresh: bool = False):
+    # ?fresh=1 forces a new probe (at most one per HEALTH_CHECK_MIN_INTERVAL)
+    status = await health_status.get(fresh)
+    if not status.ok:
+        raise HTTPException(status_code=500, detail=status.error)
+    return {
+        "message": "Welcome to FastAPI!",
+        "latency_ms": round(status.latency * 1000, 3),
+        "age_s": round(status.age(), 3),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def cpu_count():
+    # CPUs this process may run on, which can be fewer than the machine has
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the HW_2 web service")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("WEB_CONCURRENCY", cpu_count())),
+        help="worker processes (default: WEB_CONCURRENCY or the number of CPU cores)",
+    )
+    parser.add_argument(
+        "--dev", action="store_true", help="single process that reloads on code changes"
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=int(os.environ.get("GRACEFUL_TIMEOUT", 30)),
+        help="seconds to let in-flight requests finish on shutdown",
+    )
+    return parser.parse_args()
+
+
+def run(args):
+    import uvicorn
+
+    options = {"host": args.host, "port": args.port, "log_level": "info"}
+    if args.dev:
+        uvicorn.run("main:app", reload=True, **options)
+        return
+    if args.workers > 1:
+        # Workers inherit the environment, so each of them publishes its metrics to
+        # this directory and any of them can serve /metrics for the whole server
+        if not os.environ.get("METRICS_DIR"):
+            os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="hw02-metrics-")
+        reset_metrics_directory(os.environ["METRICS_DIR"])
+    # uvloop and httptools come with uvicorn[standard]; fall back to pure Python without them
+    uvicorn.run(
+        "main:app",
+        workers=args.workers,
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        http="httptools" if importlib.util.find_spec("httptools") else "h11",
+        timeout_graceful_shutdown=args.graceful_timeout,
+        access_log=False,
+        **options,
+    )
 
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=int(os.environ.get("PORT", 8000)), log_level="info", reload=True)
+    run(parse_args())
@@ -0,0 +1,282 @@
+import asyncio
+import json
+import os
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from pathlib import Path
+
+# Upper bounds in seconds, the same as the Prometheus client defaults
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+# DB time of the request being handled: [seconds, queries]. The list is shared with
+# threadpool workers and SQLAlchemy greenlets, which run in copies of the context
+request_db_time = ContextVar("request_db_time", default=None)
+
+# With several workers every process publishes its samples to METRICS_DIR (set by
+# main.run), and /metrics, served by whichever worker gets the scrape, merges them.
+# Workers publish every METRICS_FLUSH_INTERVAL seconds; gauges of a worker that
+# has not published for METRICS_STALE_AFTER seconds are dropped as exited
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", 1))
+METRICS_STALE_AFTER = float(os.environ.get("METRICS_STALE_AFTER", 5))
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += count
+            yield f"{name}_bucket", {**labels, "le": str(bound)}, cumulative
+        yield f"{name}_sum", labels, self.sum
+        yield f"{name}_count", labels, self.count
+
+
+class Metrics:
+    """
+    Request and database metrics rendered in Prometheus text format.
+
+    In a single process they are kept in memory. When `directory` is set (one
+    worker per CPU), `render` merges what all workers have published there:
+    counters and histograms are summed, so totals stay monotonic even after a
+    worker exits or is restarted, and gauges get a `worker` (pid) label.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = Path(directory) if directory else None
+        self._task = None
+        self.in_flight = 0
+        self.requests = {}  # (method, route, status) -> count
+        self.latency = {}  # (method, route) -> Histogram
+        self.db_time = {}  # (method, route) -> Histogram
+        self.db_queries = {}  # (method, route) -> count
+        self.query_latency = Histogram()
+        self.engines = {}  # pool label -> engine
+
+    def observe_request(self, method, route, status, seconds, db_seconds, db_queries):
+        key = (method, route)
+        self.requests[key + (status,)] = self.requests.get(key + (status,), 0) + 1
+        self.latency.setdefault(key, Histogram()).observe(seconds)
+        self.db_time.setdefault(key, Histogram()).observe(db_seconds)
+        self.db_queries[key] = self.db_queries.get(key, 0) + db_queries
+
+    def instrument_engine(self, name, engine):
+        """Time every cursor execution of a (sync) engine and report its pool."""
+        from sqlalchemy import event
+
+        self.engines[name] = engine
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+            self.query_latency.observe(elapsed)
+            accumulator = request_db_time.get()
+            if accumulator is not None:
+                accumulator[0] += elapsed
+                accumulator[1] += 1
+
+    def families(self):
+        """Yield (name, type, help, samples) for every metric family."""
+        yield "http_requests_in_flight", "gauge", "Requests being handled.", [
+            ("http_requests_in_flight", {}, self.in_flight)
+        ]
+        yield "http_requests_total", "counter", "Handled requests.", [
+            ("http_requests_total", {"method": method, "route": route, "status": status}, count)
+            for (method, route, status), count in self.requests.items()
+        ]
+        for name, help_text, histograms in (
+            ("http_request_duration_seconds", "Request latency.", self.latency),
+            ("http_request_db_seconds", "Time spent in database queries per request.", self.db_time),
+        ):
+            yield name, "histogram", help_text, [
+                sample
+                for (method, route), histogram in histograms.items()
+                for sample in histogram.samples(name, {"method": method, "route": route})
+            ]
+        yield "http_request_db_queries_total", "counter", "Database queries made by requests.", [
+            ("http_request_db_queries_total", {"method": method, "route": route}, count)
+            for (method, route), count in self.db_queries.items()
+        ]
+        yield "db_query_duration_seconds", "histogram", "Latency of all database queries.", list(
+            self.query_latency.samples("db_query_duration_seconds", {})
+        )
+        yield from self.pool_families()
+
+    def pool_families(self):
+        from conf.pools import pool_metrics
+
+        gauges = {
+            "size": "Connections kept in the pool.",
+            "checked_out": "Connections in use.",
+            "idle": "Connections waiting in the pool.",
+            "overflow": "Connections opened above the pool size.",
+        }
+        pools = {name: pool_metrics(engine) for name, engine in self.engines.items()}
+        for field, help_text in gauges.items():
+            name = f"db_pool_{field}"
+            yield name, "gauge", help_text, [
+                (name, {"pool": pool}, metrics[field])
+                for pool, metrics in pools.items()
+                if field in metrics
+            ]
+
+        stats = {
+            name: engine.pool.wait_stats
+            for name, engine in self.engines.items()
+            if getattr(engine.pool, "wait_stats", None) is not None
+        }
+        for name, help_text, attribute in (
+            ("db_pool_checkouts_total", "Connection checkouts.", "checkouts"),
+            ("db_pool_checkout_timeouts_total", "Checkouts that timed out.", "timeouts"),
+            ("db_pool_checkout_wait_seconds_total", "Time spent waiting for a connection.", "total_seconds"),
+        ):
+            yield name, "counter", help_text, [
+                (name, {"pool": pool}, getattr(wait_stats, attribute)) for pool, wait_stats in stats.items()
+            ]
+        yield "db_pool_checkout_wait_max_seconds", "gauge", "Longest wait for a connection.", [
+            ("db_pool_checkout_wait_max_seconds", {"pool": pool}, wait_stats.max_seconds)
+            for pool, wait_stats in stats.items()
+        ]
+
+    def publish(self):
+        """Write this worker's samples to the shared directory."""
+        path = self.directory / f"{os.getpid()}.json"
+        temporary = path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(list(self.families())))
+        # Readers see either the previous file or the new one, never a partial write
+        os.replace(temporary, path)
+
+    def collect(self):
+        """Merge the samples published by all workers, including exited ones."""
+        self.publish()
+        merged = {}  # name -> (type, help, {(sample name, labels): value})
+        now = time.time()
+        for path in self.directory.glob("*.json"):
+            try:
+                families = json.loads(path.read_text())
+                live = now - path.stat().st_mtime < METRICS_STALE_AFTER
+            except (OSError, ValueError):
+                continue
+            for name, kind, help_text, samples in families:
+                values = merged.setdefault(name, (kind, help_text, {}))[2]
+                for sample_name, labels, value in samples:
+                    if kind == "gauge":
+                        # A sum of gauges such as the pool size would mislead; keep them per worker
+                        if live:
+                            values[sample_name, tuple({**labels, "worker": path.stem}.items())] = value
+                    else:
+                        key = (sample_name, tuple(labels.items()))
+                        values[key] = values.get(key, 0) + value
+        for name, (kind, help_text, values) in merged.items():
+            yield name, kind, help_text, [
+                (sample_name, dict(labels), value) for (sample_name, labels), value in values.items()
+            ]
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(METRICS_FLUSH_INTERVAL)
+            self.publish()
+
+    def start(self):
+        if self.directory is not None:
+            self.publish()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            # Keep the final counters of this worker in the totals
+            self.publish()
+
+    def render(self):
+        lines = []
+        families = self.collect() if self.directory is not None else self.families()
+        for name, kind, help_text, samples in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        for value in labels.values()
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and DB time of every HTTP request."""
+
+    def __init__(self, app, metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        accumulator = [0.0, 0]
+        token = request_db_time.set(accumulator)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.metrics.in_flight += 1
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start_time
+            self.metrics.in_flight -= 1
+            request_db_time.reset(token)
+            # The router stores the matched route in the scope; label by its template
+            # so that paths with parameters do not create a series per URL
+            route = scope.get("route")
+            self.metrics.observe_request(
+                scope["method"],
+                route.path if route is not None else "<unmatched>",
+                str(status),
+                elapsed,
+                accumulator[0],
+                accumulator[1],
+            )
+
+
+def reset_metrics_directory(directory):
+    """Create `directory` or remove the samples a previous run left in it."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for path in directory.glob("*.json"):
+        path.unlink()
+
+
+metrics = Metrics(os.environ.get("METRICS_DIR"))
@@ -0,0 +1,86 @@
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from requests import (
+    DEFAULT_ITERSIZE,
+    get_incomplete_tasks,
+    get_tasks,
+    get_users_and_task_count,
+    iter_incomplete_tasks,
+    iter_tasks,
+    iter_users_and_task_count,
+)
+
+# Compares client memory of the fetchall functions with their streaming
+# (server-side cursor) variants. Every case runs in a fresh process, because
+# the peak RSS of a process only grows and libpq buffers are invisible to tracemalloc:
+#
+#     python bench_memory.py
+#     python bench_memory.py --itersize 500
+
+CASES = {
+    "get_tasks": lambda itersize: get_tasks() or [],
+    "iter_tasks": lambda itersize: iter_tasks(itersize=itersize),
+    "get_incomplete_tasks": lambda itersize: get_incomplete_tasks(),
+    "iter_incomplete_tasks": lambda itersize: iter_incomplete_tasks(itersize=itersize),
+    "get_users_and_task_count": lambda itersize: get_users_and_task_count() or [],
+    "iter_users_and_task_count": lambda itersize: iter_users_and_task_count(itersize=itersize),
+}
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_case(name, itersize):
+    # Consume all rows the way a caller would and measure the memory needed for it
+    baseline_rss = peak_rss_mb()
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    rows = 0
+    for _ in CASES[name](itersize):
+        rows += 1
+    elapsed = time.perf_counter() - start_time
+    python_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "case": name,
+        "rows": rows,
+        "seconds": elapsed,
+        "python_peak_mb": python_peak / 1024 / 1024,
+        "rss_growth_mb": peak_rss_mb() - baseline_rss,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Memory of fetchall vs server-side cursors")
+    parser.add_argument("--itersize", type=int, default=DEFAULT_ITERSIZE, help="rows per round trip")
+    parser.add_argument("--case", choices=CASES, help="run a single case (used internally)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.case:
+        print(json.dumps(run_case(args.case, args.itersize)))
+        sys.exit()
+
+    print(f"{'case':<28} {'rows':>9} {'seconds':>8} {'Python peak MB':>15} {'RSS growth MB':>14}")
+    for name in CASES:
+        output = subprocess.run(
+            [sys.executable, __file__, "--case", name, "--itersize", str(args.itersize)],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{result['case']:<28} {result['rows']:>9} {result['seconds']:>8.2f} "
+            f"{result['python_peak_mb']:>15.1f} {result['rss_growth_mb']:>14.1f}"
+        )
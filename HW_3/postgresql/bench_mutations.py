@@ -0,0 +1,106 @@
+import argparse
+import contextlib
+import io
+import time
+
+from db import get_connection
+from requests import (
+    insert_task,
+    insert_tasks_bulk,
+    update_task_status,
+    update_task_status_bulk,
+)
+
+# Per-row update_task_status / insert_task loops against the bulk functions.
+# Updated tasks get their original statuses back and inserted tasks are deleted:
+#
+#     python bench_mutations.py --rows 2000
+
+BENCH_TITLE = "bench_mutations task"
+
+
+def timed(func, *args):
+    # The per-row functions print a line per call; keep the output readable
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args)
+    return time.perf_counter() - start_time, result
+
+
+def sample_tasks(conn, rows):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT tasks.id, status.name
+            FROM tasks
+            JOIN status ON tasks.status_id = status.id
+            ORDER BY tasks.id
+            LIMIT %s;
+            """,
+            (rows,),
+        )
+        return cur.fetchall()
+
+
+def restore_statuses(conn, tasks):
+    by_status = {}
+    for task_id, status_name in tasks:
+        by_status.setdefault(status_name, []).append(task_id)
+    for status_name, task_ids in by_status.items():
+        timed(update_task_status_bulk, conn, task_ids, status_name)
+
+
+def delete_bench_tasks(conn):
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM tasks WHERE title = %s;", (BENCH_TITLE,))
+    conn.commit()
+
+
+def report(label, rows, seconds, baseline):
+    print(f"{label:<34} {seconds:8.3f} s  {rows / seconds:10.0f} rows/s  x{baseline / seconds:.1f}")
+
+
+def bench_updates(conn, rows):
+    tasks = sample_tasks(conn, rows)
+    task_ids = [task_id for task_id, _ in tasks]
+
+    def loop():
+        for task_id in task_ids:
+            update_task_status(conn, task_id, "in_progress")
+
+    loop_time, _ = timed(loop)
+    bulk_time, updated = timed(update_task_status_bulk, conn, task_ids, "completed")
+    assert len(updated) == len(task_ids)
+    restore_statuses(conn, tasks)
+    report("update_task_status (per row)", len(task_ids), loop_time, loop_time)
+    report("update_task_status_bulk", len(task_ids), bulk_time, loop_time)
+
+
+def bench_inserts(conn, rows):
+    with conn.cursor() as cur:
+        cur.execute("SELECT id FROM users ORDER BY id LIMIT 1;")
+        user_id = cur.fetchone()[0]
+    new_tasks = [(user_id, BENCH_TITLE, "Inserted by bench_mutations.py", "new")] * rows
+
+    def loop():
+        for task in new_tasks:
+            insert_task(conn, *task)
+
+    try:
+        loop_time, _ = timed(loop)
+        bulk_time, new_ids = timed(insert_tasks_bulk, conn, new_tasks)
+        assert len(new_ids) == rows
+    finally:
+        delete_bench_tasks(conn)
+    report("insert_task (per row)", rows, loop_time, loop_time)
+    report("insert_tasks_bulk", rows, bulk_time, loop_time)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-row vs bulk task mutations")
+    parser.add_argument("--rows", type=int, default=2000, help="tasks to update and to insert")
+    args = parser.parse_args()
+
+    with get_connection() as conn:
+        bench_updates(conn, args.rows)
+        bench_inserts(conn, args.rows)
@@ -1,20 +1,7 @@
-import os
 import psycopg2
 from psycopg2 import sql
-from dotenv import load_dotenv
 
-# Load environment variables from the .env file
-load_dotenv()
-
-# Parameters for PostgreSQL connection
-# Use "postgres" as the database name for administrative tasks (creating new databases, etc.)
-DB_NAME = os.getenv(
-    "DB_NAME"
-)  # DB_NAME is now set to "postgres" for administrative tasks
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_PORT = os.getenv("DB_PORT", "5432")
+from db import DB_NAME, connection_parameters, create_connection
 
 
 def create_database():
@@ -22,13 +9,7 @@ def create_database():
     conn = None
     try:
         # Connect to the PostgreSQL system database "postgres" for administrative tasks
-        conn = psycopg2.connect(
-            dbname="postgres",  # Initially connecting to the "postgres" system database
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-        )
+        conn = psycopg2.connect(**connection_parameters("postgres"))
         conn.autocommit = True  # Enable autocommit so that we can create databases
         cur = conn.cursor()
 
@@ -53,24 +34,6 @@ def create_database():
             conn.close()
 
 
-def create_connection():
-    """Connects to the newly created `hw3` database (after it's created)."""
-    try:
-        # Connect to the newly created `hw3` database
-        conn = psycopg2.connect(
-            dbname=DB_NAME,  # Now we use DB_NAME which is "hw3" after the database is created
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-        )
-        conn.autocommit = True
-        return conn
-    except psycopg2.Error as e:
-        print(f"Error connecting to the `{DB_NAME}` database: {e}")
-        return None
-
-
 def create_sql_table():
     """Generates an SQL script and saves it in the current directory as `hw3.sql`."""
     sql_script = """
@@ -117,6 +80,74 @@ def execute_sql_file(conn, sql_file_path):
         print(f"Error executing the SQL script: {e}")
 
 
+# Indexes for the queries in requests.py: foreign keys used in joins and filters,
+# and trigram index for LIKE patterns on emails (e.g. '%@gmail.com').
+# The foreign key indexes end with tasks.id, so that a page of get_tasks_page
+# (WHERE user_id = ... AND id > ... ORDER BY id) is a single index range scan.
+INDEX_STATEMENTS = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tasks_user_id_id ON tasks (user_id, id);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tasks_status_id_id ON tasks (status_id, id);",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_email_trgm "
+    "ON users USING gin (email gin_trgm_ops);",
+    "ANALYZE users;",
+    "ANALYZE tasks;",
+]
+
+
+def create_indexes(conn):
+    """
+    Creates the indexes without locking the tables against writes.
+    CREATE INDEX CONCURRENTLY cannot run inside a transaction, so autocommit is required.
+    """
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        for statement in INDEX_STATEMENTS:
+            try:
+                cur.execute(statement)
+                print(f"Executed: {statement}")
+            except psycopg2.Error as e:
+                # E.g. pg_trgm is not installed: the remaining indexes are still useful
+                print(f"Error executing `{statement}`: {e}")
+
+
+# Precomputed counts for the dashboard (read by the *_cached functions in requests.py).
+# The unique indexes are required for REFRESH MATERIALIZED VIEW CONCURRENTLY,
+# which keeps the views readable while they are refreshed.
+MATERIALIZED_VIEW_STATEMENTS = [
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS task_count_by_status AS
+    SELECT status.id AS status_id, status.name AS status_name, COUNT(tasks.id) AS task_count
+    FROM tasks
+    JOIN status ON tasks.status_id = status.id
+    GROUP BY status.id, status.name;
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_task_count_by_status "
+    "ON task_count_by_status (status_id);",
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS user_task_count AS
+    SELECT users.id AS user_id, users.fullname AS user_fullname, COUNT(tasks.id) AS task_count
+    FROM users
+    LEFT JOIN tasks ON users.id = tasks.user_id
+    GROUP BY users.id;
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_user_task_count ON user_task_count (user_id);",
+    "CREATE INDEX IF NOT EXISTS idx_user_task_count_fullname ON user_task_count (user_fullname);",
+]
+
+
+def create_materialized_views(conn):
+    """Creates the materialized views with the task counts and their indexes."""
+    with conn.cursor() as cur:
+        for statement in MATERIALIZED_VIEW_STATEMENTS:
+            try:
+                cur.execute(statement)
+            except psycopg2.Error as e:
+                print(f"Error creating the materialized views: {e}")
+                return
+    print("Materialized views created successfully.")
+
+
 if __name__ == "__main__":
     # 1. Create the `hw3` database if it doesn't exist
     create_database()
@@ -124,11 +155,15 @@ if __name__ == "__main__":
     # 2. Create the SQL script file `hw3.sql`
     sql_file_path = create_sql_table()
 
-    # 3. Connect to the newly created `hw3` database
-    conn = create_connection()
+    # 3. Connect to the newly created `hw3` database (autocommit: DDL and CREATE INDEX CONCURRENTLY)
+    conn = create_connection(autocommit=True)
     if conn:
         # 4. Execute the SQL script to create tables
         execute_sql_file(conn, sql_file_path)
+        # 5. Create the indexes (safe to run again on existing tables)
+        create_indexes(conn)
+        # 6. Create the materialized views with task counts
+        create_materialized_views(conn)
         conn.close()
     else:
         print("Error! Could not connect to the `hw3` database.")
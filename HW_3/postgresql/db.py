@@ -0,0 +1,143 @@
+import inspect
+import os
+import threading
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import ThreadedConnectionPool
+from dotenv import load_dotenv
+
+# Load environment variables from the .env file
+load_dotenv()
+
+# Parameters for PostgreSQL connection
+DB_NAME = os.getenv("DB_NAME")
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_HOST = os.getenv("DB_HOST", "localhost")
+DB_PORT = os.getenv("DB_PORT", "5432")
+
+# Pool size and how long to wait for a free connection when all are in use.
+# psycopg2 keeps only DB_POOL_MIN idle connections and closes the rest when they
+# are returned, so DB_POOL_MIN should cover the usual concurrency
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 5))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+
+_pool = None
+_pool_lock = threading.Lock()
+# ThreadedConnectionPool raises PoolError instead of waiting when it is exhausted,
+# so callers first take one of DB_POOL_MAX slots
+_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+
+
+def connection_parameters(dbname=None):
+    return {
+        "dbname": dbname or DB_NAME,
+        "user": DB_USER,
+        "password": DB_PASSWORD,
+        "host": DB_HOST,
+        "port": DB_PORT,
+    }
+
+
+def create_connection(dbname=None, autocommit=False):
+    """Opens a new connection that is not pooled (for DDL and other one-off scripts)."""
+    try:
+        conn = psycopg2.connect(**connection_parameters(dbname))
+        conn.autocommit = autocommit
+        return conn
+    except psycopg2.Error as e:
+        print(f"Error connecting to the `{dbname or DB_NAME}` database: {e}")
+        return None
+
+
+def get_pool():
+    """Returns the shared pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadedConnectionPool(
+                DB_POOL_MIN, DB_POOL_MAX, **connection_parameters()
+            )
+        return _pool
+
+
+def close_pool():
+    """Closes all pooled connections."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+@contextmanager
+def get_connection():
+    """
+    Checks a connection out of the pool for the duration of the `with` block.
+    Raises psycopg2.Error if the database is unreachable.
+    An unfinished transaction is rolled back before the connection is returned.
+    """
+    if not _pool_slots.acquire(timeout=DB_POOL_TIMEOUT):
+        raise TimeoutError(f"No free connection in the pool after {DB_POOL_TIMEOUT} s")
+    try:
+        pool = get_pool()
+        conn = pool.getconn()
+        try:
+            yield conn
+        finally:
+            if not conn.closed:
+                if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                conn.autocommit = False
+            pool.putconn(conn, close=bool(conn.closed))
+    finally:
+        _pool_slots.release()
+
+
+def _open_connection(stack):
+    # Enter get_connection() on `stack`; print the error and return None if the
+    # database is unreachable, so that the wrapped function is not called at all
+    try:
+        return stack.enter_context(get_connection())
+    except psycopg2.Error as e:
+        print(f"Error connecting to the `{DB_NAME}` database: {e}")
+        return None
+
+
+def with_connection(func):
+    """
+    Lets `func(conn, ...)` be called with conn=None (or without it):
+    a pooled connection is then checked out for the duration of the call.
+    For generator functions the connection is held until the generator
+    is exhausted or closed. If the database is unreachable, the error is
+    printed and `func` is not called (the call returns None / yields nothing).
+    """
+
+    if inspect.isgeneratorfunction(func):
+
+        @wraps(func)
+        def generator_wrapper(conn=None, *args, **kwargs):
+            if conn is not None:
+                yield from func(conn, *args, **kwargs)
+                return
+            with ExitStack() as stack:
+                conn = _open_connection(stack)
+                if conn is not None:
+                    yield from func(conn, *args, **kwargs)
+
+        return generator_wrapper
+
+    @wraps(func)
+    def wrapper(conn=None, *args, **kwargs):
+        if conn is not None:
+            return func(conn, *args, **kwargs)
+        with ExitStack() as stack:
+            conn = _open_connection(stack)
+            if conn is not None:
+                return func(conn, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,121 @@
+import argparse
+import json
+from datetime import datetime, timezone
+
+from db import DB_NAME, get_connection
+from requests import (
+    GET_TASKS_SQL,
+    INCOMPLETE_TASKS_SQL,
+    TASK_COUNT_BY_STATUS_SQL,
+    TASKS_BY_EMAIL_DOMAIN_SQL,
+    TASKS_WITHOUT_DESCRIPTION_SQL,
+    USERS_AND_TASK_COUNT_SQL,
+    USERS_BY_EMAIL_SQL,
+    USERS_WITH_STATUS_TASKS_SQL,
+    USERS_WITHOUT_TASKS_SQL,
+)
+
+# Runs the queries of requests.py with EXPLAIN (ANALYZE, BUFFERS) and saves
+# the plans and timings to a JSON file, to compare before/after adding indexes:
+#
+#     python explain_queries.py --output explain_before.json
+#     python create_table.py
+#     python explain_queries.py --output explain_after.json
+
+
+def sample_parameters(conn):
+    # Pick a user and an email that exist, so that the queries return rows
+    with conn.cursor() as cur:
+        cur.execute("SELECT user_id FROM tasks WHERE user_id IS NOT NULL LIMIT 1;")
+        row = cur.fetchone()
+        user_id = row[0] if row else 1
+        cur.execute("SELECT email FROM users WHERE id = %s;", (user_id,))
+        row = cur.fetchone()
+        email = row[0] if row else "lynn03@example.net"
+    return user_id, email
+
+
+def queries_to_explain(user_id, email, domain):
+    # (name, sql, params) for every read query of requests.py
+    return [
+        ("get_tasks (user_id)", GET_TASKS_SQL + " WHERE tasks.user_id = %s", (user_id,)),
+        ("get_tasks (status_name)", GET_TASKS_SQL + " WHERE status.name = %s", ("new",)),
+        ("get_users_without_tasks", USERS_WITHOUT_TASKS_SQL, ()),
+        ("get_incomplete_tasks", INCOMPLETE_TASKS_SQL, ()),
+        ("get_users_by_email", USERS_BY_EMAIL_SQL, (email,)),
+        ("get_task_count_by_status", TASK_COUNT_BY_STATUS_SQL, ()),
+        ("get_tasks_by_email_domain", TASKS_BY_EMAIL_DOMAIN_SQL, (f"%@{domain}",)),
+        ("get_tasks_without_description", TASKS_WITHOUT_DESCRIPTION_SQL, ()),
+        ("get_users_with_in_progress_tasks", USERS_WITH_STATUS_TASKS_SQL, ("in_progress",)),
+        ("get_users_and_task_count", USERS_AND_TASK_COUNT_SQL, ()),
+    ]
+
+
+def walk_plan(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk_plan(child)
+
+
+def explain(conn, name, query, params, runs):
+    # EXPLAIN ANALYZE executes the query; keep the fastest of `runs` executions
+    best = None
+    with conn.cursor() as cur:
+        for _ in range(runs):
+            cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+            result = cur.fetchone()[0][0]
+            if best is None or result["Execution Time"] < best["Execution Time"]:
+                best = result
+    conn.rollback()
+
+    plan = best["Plan"]
+    nodes = list(walk_plan(plan))
+    return {
+        "name": name,
+        "sql": " ".join(query.split()),
+        "params": list(params),
+        "planning_ms": best["Planning Time"],
+        "execution_ms": best["Execution Time"],
+        "rows": plan.get("Actual Rows"),
+        "shared_hit_blocks": plan.get("Shared Hit Blocks", 0),
+        "shared_read_blocks": plan.get("Shared Read Blocks", 0),
+        "seq_scans": sorted(
+            {node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"}
+        ),
+        "index_scans": sorted(
+            {node["Index Name"] for node in nodes if "Index Name" in node}
+        ),
+        "plan": plan,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE the queries of requests.py")
+    parser.add_argument("--output", default="explain_results.json", help="JSON file for the results")
+    parser.add_argument("--runs", type=int, default=3, help="executions per query, the fastest is kept")
+    parser.add_argument("--domain", default="gmail.com", help="domain for get_tasks_by_email_domain")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    with get_connection() as conn:
+        user_id, email = sample_parameters(conn)
+        results = []
+        for name, query, params in queries_to_explain(user_id, email, args.domain):
+            result = explain(conn, name, query, params, args.runs)
+            results.append(result)
+            print(
+                f"{name:<34} {result['execution_ms']:10.2f} ms  rows={result['rows']:<8} "
+                f"seq scans: {', '.join(result['seq_scans']) or '-'}; "
+                f"indexes: {', '.join(result['index_scans']) or '-'}"
+            )
+
+        report = {
+            "database": DB_NAME,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "queries": results,
+        }
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Plans saved to the file {args.output}.")
@@ -0,0 +1,29 @@
+import argparse
+import time
+
+from db import close_pool
+from requests import refresh_task_counts
+
+# Keeps the task count materialized views fresh for the dashboard.
+# Run once (e.g. from cron) or as a loop:
+#
+#     python refresh_task_counts.py
+#     python refresh_task_counts.py --interval 60
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the task count materialized views")
+    parser.add_argument("--interval", type=float, help="repeat every N seconds instead of once")
+    args = parser.parse_args()
+
+    try:
+        while True:
+            start_time = time.perf_counter()
+            refresh_task_counts()
+            print(f"Refresh took {time.perf_counter() - start_time:.2f} s.")
+            if args.interval is None:
+                break
+            time.sleep(max(0.0, args.interval - (time.perf_counter() - start_time)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close_pool()
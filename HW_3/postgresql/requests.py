@@ -1,64 +1,233 @@
+import base64
+import json
 import os
-import psycopg2
+import time
+import uuid
+from psycopg2.extras import execute_values
 import random
-from dotenv import load_dotenv
 from faker import Faker
 
-# Load environment variables from the .env file
+from db import get_connection, with_connection
+
+# Rows fetched per round trip by the iter_* functions (server-side cursors)
+DEFAULT_ITERSIZE = 2000
+
+# Rows per page returned by get_tasks_page
+DEFAULT_PAGE_SIZE = 50
+
+# Seconds before the status cache is reloaded; unset means never (only on invalidate())
+STATUS_CACHE_TTL = os.getenv("STATUS_CACHE_TTL")
+
+# SQL of the read queries, shared with explain_queries.py
+
+GET_TASKS_SQL = """
+    SELECT tasks.id, tasks.title, tasks.description, status.name AS status
+    FROM tasks
+    JOIN status ON tasks.status_id = status.id
+"""
+
+# NOT EXISTS instead of NOT IN: it is planned as an anti-join using the
+# tasks.user_id index, and it still works when tasks.user_id contains NULL
+# (NOT IN returns no rows at all in that case)
+USERS_WITHOUT_TASKS_SQL = """
+    SELECT users.id, users.fullname
+    FROM users
+    WHERE NOT EXISTS (
+        SELECT 1
+        FROM tasks
+        WHERE tasks.user_id = users.id
+    );
+"""
+
+INCOMPLETE_TASKS_SQL = """
+    SELECT tasks.id, tasks.title, tasks.description, status.name AS status
+    FROM tasks
+    JOIN status ON tasks.status_id = status.id
+    WHERE status.name != 'завершено';
+"""
+
+USERS_BY_EMAIL_SQL = """
+    SELECT users.id, users.fullname, users.email
+    FROM users
+    WHERE users.email LIKE %s;
+"""
+
+TASK_COUNT_BY_STATUS_SQL = """
+    SELECT status.name AS status_name, COUNT(tasks.id) AS task_count
+    FROM tasks
+    JOIN status ON tasks.status_id = status.id
+    GROUP BY status.name;
+"""
+
+TASKS_BY_EMAIL_DOMAIN_SQL = """
+    SELECT tasks.id, tasks.title, tasks.description, users.email
+    FROM tasks
+    JOIN users ON tasks.user_id = users.id
+    WHERE users.email LIKE %s;
+"""
+
+TASKS_WITHOUT_DESCRIPTION_SQL = """
+    SELECT id, title
+    FROM tasks
+    WHERE description IS NULL OR description = '';
+"""
+
+USERS_WITH_STATUS_TASKS_SQL = """
+    SELECT users.id, users.fullname, tasks.id AS task_id, tasks.title AS task_title
+    FROM users
+    INNER JOIN tasks ON users.id = tasks.user_id
+    INNER JOIN status ON tasks.status_id = status.id
+    WHERE status.name = %s;
+"""
+
+USERS_AND_TASK_COUNT_SQL = """
+    SELECT
+        users.id AS user_id,
+        users.fullname AS user_fullname,
+        COUNT(tasks.id) AS task_count
+    FROM
+        users
+    LEFT JOIN
+        tasks ON users.id = tasks.user_id
+    GROUP BY
+        users.id
+    ORDER BY
+        user_fullname;
+"""
+
+# Keyset pagination: the status id is resolved once (InitPlan), so the planner can
+# walk tasks in id order through an index instead of joining and sorting all matches
+TASKS_PAGE_SQL = """
+    SELECT tasks.id, tasks.title, tasks.description, status.name AS status
+    FROM tasks
+    JOIN status ON tasks.status_id = status.id
+    WHERE tasks.id > %(after_id)s
+      AND (%(user_id)s::integer IS NULL OR tasks.user_id = %(user_id)s)
+      AND (%(status_name)s::varchar IS NULL
+           OR tasks.status_id = (SELECT id FROM status WHERE name = %(status_name)s))
+    ORDER BY tasks.id
+    LIMIT %(limit)s;
+"""
+
+# Reads from the materialized views created by create_table.py; they are as fresh
+# as the last refresh_task_counts() call
+TASK_COUNT_BY_STATUS_CACHED_SQL = """
+    SELECT status_name, task_count
+    FROM task_count_by_status;
+"""
+
+USERS_AND_TASK_COUNT_CACHED_SQL = """
+    SELECT user_id, user_fullname, task_count
+    FROM user_task_count
+    ORDER BY user_fullname;
+"""
+
+TASK_COUNT_VIEWS = ("task_count_by_status", "user_task_count")
+
+# Bulk mutations: the status name is resolved inside the statement, so a whole
+# batch is one round trip and one transaction
+UPDATE_TASK_STATUS_BULK_SQL = """
+    UPDATE tasks
+    SET status_id = status.id
+    FROM status
+    WHERE status.name = %s
+      AND tasks.id = ANY(%s)
+    RETURNING tasks.id;
+"""
+
+INSERT_TASKS_BULK_SQL = """
+    INSERT INTO tasks (user_id, title, description, status_id)
+    SELECT new_tasks.user_id, new_tasks.title, new_tasks.description, status.id
+    FROM (VALUES %s) AS new_tasks (user_id, title, description, status_name)
+    JOIN status ON status.name = new_tasks.status_name
+    RETURNING tasks.id;
+"""
+
+# Rows per INSERT statement in insert_tasks_bulk
+INSERT_PAGE_SIZE = 1000
+
+
+class StatusCache:
+    """
+    Status name -> id, loaded from the small `status` table once instead of
+    being selected on every insert/update. Call invalidate() after changing
+    the status table; with `ttl` (seconds) the cache also reloads on its own.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        # (ids, loaded_at) or None; replaced as a whole, so a reader that takes
+        # it once never sees the ids of one load with the time of another
+        self._snapshot = None
+
+    def load(self, conn):
+        with conn.cursor() as cur:
+            cur.execute("SELECT name, id FROM status;")
+            ids = dict(cur.fetchall())
+        self._snapshot = (ids, time.monotonic())
+        return ids
 
-load_dotenv()
+    def invalidate(self):
+        self._snapshot = None
 
-# Parameters for PostgreSQl connection
+    def _is_stale(self, snapshot):
+        if snapshot is None:
+            return True
+        return self.ttl is not None and time.monotonic() - snapshot[1] > self.ttl
 
-DB_NAME = os.getenv("DB_NAME")
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
+    def is_stale(self):
+        return self._is_stale(self._snapshot)
 
+    def get_id(self, conn, name):
+        # Returns the status id, or None if there is no such status. An unknown name
+        # reloads the cache once, in case the status was added after loading.
+        snapshot = self._snapshot
+        if self._is_stale(snapshot) or name not in snapshot[0]:
+            return self.load(conn).get(name)
+        return snapshot[0][name]
 
-# Function to connect to the database
-def create_connection():
-    # Connects to the 'hw3' database
-    try:
-        conn = psycopg2.connect(
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-        )
-        return conn
-    except psycopg2.Error as e:
-        print(f"Error connection to the '{DB_NAME}' database: {e}")
-        return None
+
+status_cache = StatusCache(float(STATUS_CACHE_TTL) if STATUS_CACHE_TTL else None)
+
+
+def tasks_query(user_id=None, status_name=None):
+    # Build the get_tasks query for user_id, status_name or both
+    query = GET_TASKS_SQL
+    conditions = []
+    params = []
+
+    if user_id:
+        conditions.append("tasks.user_id = %s")
+        params.append(user_id)
+
+    if status_name:
+        conditions.append("status.name = %s")
+        params.append(status_name)
+
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    return query, tuple(params)
+
+
+def stream_rows(conn, query, params=(), itersize=DEFAULT_ITERSIZE):
+    # Yield rows from a named (server-side) cursor, `itersize` rows per round trip,
+    # so only one batch is held in client memory. Named cursors live inside a
+    # transaction: it is left open for the caller (pooled connections roll it back).
+    # The iter_* functions re-raise errors: a stream cut short after some rows
+    # would otherwise look like a complete result.
+    with conn.cursor(name=f"stream_{uuid.uuid4().hex}") as cur:
+        cur.itersize = itersize
+        cur.execute(query, params)
+        yield from cur
 
 
 # Using the get_tasks function
+@with_connection
 def get_tasks(conn, user_id=None, status_name=None):
     # Get tasks based on user_id, status_name or both
     try:
         with conn.cursor() as cur:
-            query = """
-                SELECT tasks.id, tasks.title, tasks.description, status.name AS status
-                FROM tasks
-                JOIN status ON tasks.status_id = status.id
-            """
-            conditions = []
-            params = []
-
-            if user_id:
-                conditions.append("tasks.user_id = %s")
-                params.append(user_id)
-
-            if status_name:
-                conditions.append("status.name = %s")
-                params.append(status_name)
-
-            if conditions:
-                query += " WHERE " + " AND ".join(conditions)
-
-            cur.execute(query, tuple(params))
+            cur.execute(*tasks_query(user_id, status_name))
             tasks = cur.fetchall()
             if tasks:
                 return tasks
@@ -69,18 +238,77 @@ def get_tasks(conn, user_id=None, status_name=None):
         return []
 
 
+# Streaming variant of get_tasks for large results
+@with_connection
+def iter_tasks(conn, user_id=None, status_name=None, itersize=DEFAULT_ITERSIZE):
+    try:
+        query, params = tasks_query(user_id, status_name)
+        yield from stream_rows(conn, query, params, itersize)
+    except Exception as e:
+        print(f"Error fetching tasks: {e}")
+        raise
+
+
+def encode_page_token(last_id, user_id, status_name):
+    # The token carries the filters too, so it cannot be reused with other ones
+    data = json.dumps({"after": last_id, "user_id": user_id, "status": status_name})
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_page_token(token, user_id, status_name):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode()))
+        after_id = int(data["after"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid page token: {e}") from e
+    if data.get("user_id") != user_id or data.get("status") != status_name:
+        raise ValueError("Page token was issued for different filters")
+    return after_id
+
+
+# Paginated get_tasks: returns (tasks, next_token); next_token is None on the last page
+@with_connection
+def get_tasks_page(
+    conn, user_id=None, status_name=None, page_size=DEFAULT_PAGE_SIZE, token=None
+):
+    # Keyset pagination (id > last id) keeps every page O(page_size), unlike OFFSET
+    # Bad arguments raise ValueError: returning an empty page would look like the last one
+    if page_size < 1:
+        raise ValueError(f"page_size must be at least 1, got {page_size}")
+    after_id = decode_page_token(token, user_id, status_name) if token else 0
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                TASKS_PAGE_SQL,
+                {
+                    "after_id": after_id,
+                    "user_id": user_id,
+                    "status_name": status_name,
+                    # One extra row tells whether there is a next page
+                    "limit": page_size + 1,
+                },
+            )
+            tasks = cur.fetchall()
+        if len(tasks) > page_size:
+            tasks = tasks[:page_size]
+            return tasks, encode_page_token(tasks[-1][0], user_id, status_name)
+        return tasks, None
+    except Exception as e:
+        print(f"Error fetching tasks page: {e}")
+        return [], None
+
+
 # Using the update_task_status function
+@with_connection
 def update_task_status(conn, task_id, new_status_name):
     # Update the status of a task
     try:
         with conn.cursor() as cur:
-            # Ensure that the status exists in the 'status' table
-            cur.execute("SELECT id FROM status WHERE name = %s", (new_status_name,))
-            status = cur.fetchone()
+            # Ensure that the status exists in the 'status' table (cached)
+            status_id = status_cache.get_id(conn, new_status_name)
 
-            if status:
+            if status_id is not None:
                 # If the status exists, update the task's status
-                status_id = status[0]
                 cur.execute(
                     """
                     UPDATE tasks
@@ -107,19 +335,31 @@ def update_task_status(conn, task_id, new_status_name):
         conn.rollback()
 
 
+# Update the status of many tasks with a single UPDATE
+@with_connection
+def update_task_status_bulk(conn, task_ids, new_status_name):
+    try:
+        with conn.cursor() as cur:
+            cur.execute(UPDATE_TASK_STATUS_BULK_SQL, (new_status_name, list(task_ids)))
+            updated_ids = [row[0] for row in cur.fetchall()]
+        conn.commit()
+        if updated_ids:
+            print(f"{len(updated_ids)} tasks updated to {new_status_name}.")
+        else:
+            print(f"No tasks updated (unknown tasks or status '{new_status_name}').")
+        return updated_ids
+    except Exception as e:
+        print(f"Error updating task statuses: {e}")
+        conn.rollback()
+        return []
+
+
 # Function to get users without tasks
+@with_connection
 def get_users_without_tasks(conn):
     try:
         with conn.cursor() as cur:
-            query = """
-                SELECT users.id, users.fullname
-                FROM users
-                WHERE users.id NOT IN (
-                    SELECT DISTINCT tasks.user_id
-                    FROM tasks
-                );
-            """
-            cur.execute(query)
+            cur.execute(USERS_WITHOUT_TASKS_SQL)
             users = cur.fetchall()
             if users:
                 return users
@@ -131,15 +371,14 @@ def get_users_without_tasks(conn):
 
 
 # Function to insert a new task
+@with_connection
 def insert_task(conn, user_id, title, description, status_name):
     try:
         with conn.cursor() as cur:
-            # Ensure that the status exists in the 'status' table
-            cur.execute("SELECT id FROM status WHERE name = %s", (status_name,))
-            status = cur.fetchone()
+            # Ensure that the status exists in the 'status' table (cached)
+            status_id = status_cache.get_id(conn, status_name)
 
-            if status:
-                status_id = status[0]
+            if status_id is not None:
                 # Insert the new task into the 'tasks' table
                 cur.execute(
                     """
@@ -167,17 +406,45 @@ def insert_task(conn, user_id, title, description, status_name):
         conn.rollback()
 
 
+# Insert many tasks at once: `tasks` is an iterable of
+# (user_id, title, description, status_name); rows with an unknown status are
+# reported by status name and skipped
+@with_connection
+def insert_tasks_bulk(conn, tasks):
+    try:
+        tasks = list(tasks)
+        # Ensure that the statuses exist in the 'status' table (cached)
+        unknown = {
+            status_name
+            for status_name in {task[3] for task in tasks}
+            if status_cache.get_id(conn, status_name) is None
+        }
+        for status_name in sorted(unknown, key=str):
+            skipped = sum(1 for task in tasks if task[3] == status_name)
+            print(f"Status '{status_name}' does not exist, {skipped} tasks skipped.")
+        valid_tasks = [task for task in tasks if task[3] not in unknown]
+        rows = []
+        if valid_tasks:
+            with conn.cursor() as cur:
+                rows = execute_values(
+                    cur, INSERT_TASKS_BULK_SQL, valid_tasks, page_size=INSERT_PAGE_SIZE, fetch=True
+                )
+            conn.commit()
+        new_ids = [row[0] for row in rows]
+        print(f"Added {len(new_ids)} of {len(tasks)} tasks.")
+        return new_ids
+    except Exception as e:
+        print(f"Error inserting tasks: {e}")
+        conn.rollback()
+        return []
+
+
 # Function to get tasks that are not completed
+@with_connection
 def get_incomplete_tasks(conn):
     try:
         with conn.cursor() as cur:
-            query = """
-                SELECT tasks.id, tasks.title, tasks.description, status.name AS status
-                FROM tasks
-                JOIN status ON tasks.status_id = status.id
-                WHERE status.name != 'завершено';
-            """
-            cur.execute(query)
+            cur.execute(INCOMPLETE_TASKS_SQL)
             tasks = cur.fetchall()
             if tasks:
                 return tasks
@@ -188,7 +455,18 @@ def get_incomplete_tasks(conn):
         return []
 
 
+# Streaming variant of get_incomplete_tasks
+@with_connection
+def iter_incomplete_tasks(conn, itersize=DEFAULT_ITERSIZE):
+    try:
+        yield from stream_rows(conn, INCOMPLETE_TASKS_SQL, (), itersize)
+    except Exception as e:
+        print(f"Error fetching incomplete tasks: {e}")
+        raise
+
+
 # Function to delete a task by id
+@with_connection
 def delete_task(conn, task_id):
     try:
         with conn.cursor() as cur:
@@ -206,15 +484,11 @@ def delete_task(conn, task_id):
 
 
 # Function to get users with a certain email pattern
+@with_connection
 def get_users_by_email(conn, email_pattern):
     try:
         with conn.cursor() as cur:
-            query = """
-                SELECT users.id, users.fullname, users.email
-                FROM users
-                WHERE users.email LIKE %s;
-            """
-            cur.execute(query, (email_pattern,))
+            cur.execute(USERS_BY_EMAIL_SQL, (email_pattern,))
             users = cur.fetchall()
             if users:
                 return users
@@ -226,6 +500,7 @@ def get_users_by_email(conn, email_pattern):
 
 
 # Function to update user's name
+@with_connection
 def update_user_name(conn, user_id, new_fullname):
     try:
         with conn.cursor() as cur:
@@ -256,16 +531,11 @@ def update_user_name(conn, user_id, new_fullname):
 
 
 # Function to get task count for each status
+@with_connection
 def get_task_count_by_status(conn):
     try:
         with conn.cursor() as cur:
-            query = """
-                SELECT status.name AS status_name, COUNT(tasks.id) AS task_count
-                FROM tasks
-                JOIN status ON tasks.status_id = status.id
-                GROUP BY status.name;
-            """
-            cur.execute(query)
+            cur.execute(TASK_COUNT_BY_STATUS_SQL)
             result = cur.fetchall()
             return result
     except Exception as e:
@@ -273,16 +543,40 @@ def get_task_count_by_status(conn):
         return []
 
 
+# Same as get_task_count_by_status, read from the task_count_by_status view:
+# one row per status instead of a scan over all tasks
+@with_connection
+def get_task_count_by_status_cached(conn):
+    try:
+        with conn.cursor() as cur:
+            cur.execute(TASK_COUNT_BY_STATUS_CACHED_SQL)
+            return cur.fetchall()
+    except Exception as e:
+        print(f"Error fetching task counts: {e}")
+        return []
+
+
+# Recompute the materialized views with task counts, e.g. from cron or a loop
+@with_connection
+def refresh_task_counts(conn, concurrently=True):
+    # CONCURRENTLY lets readers use the old contents while the new ones are built
+    mode = "CONCURRENTLY " if concurrently else ""
+    try:
+        with conn.cursor() as cur:
+            for view in TASK_COUNT_VIEWS:
+                cur.execute(f"REFRESH MATERIALIZED VIEW {mode}{view};")
+        conn.commit()
+        print(f"Refreshed {', '.join(TASK_COUNT_VIEWS)}.")
+    except Exception as e:
+        print(f"Error refreshing task counts: {e}")
+        conn.rollback()
+
+
+@with_connection
 def get_tasks_by_email_domain(conn, domain):
     try:
         with conn.cursor() as cur:
-            query = """
-                SELECT tasks.id, tasks.title, tasks.description, users.email
-                FROM tasks
-                JOIN users ON tasks.user_id = users.id
-                WHERE users.email LIKE %s;
-            """
-            cur.execute(query, (f"%@{domain}",))
+            cur.execute(TASKS_BY_EMAIL_DOMAIN_SQL, (f"%@{domain}",))
             tasks = cur.fetchall()
             if tasks:
                 return tasks
@@ -294,15 +588,11 @@ def get_tasks_by_email_domain(conn, domain):
 
 
 # Function to get tasks without description
+@with_connection
 def get_tasks_without_description(conn):
     try:
         with conn.cursor() as cur:
-            query = """
-                SELECT id, title
-                FROM tasks
-                WHERE description IS NULL OR description = '';
-            """
-            cur.execute(query)
+            cur.execute(TASKS_WITHOUT_DESCRIPTION_SQL)
             tasks = cur.fetchall()
             if tasks:
                 return tasks
@@ -313,17 +603,11 @@ def get_tasks_without_description(conn):
         return []
 
 
+@with_connection
 def get_users_with_in_progress_tasks(conn):
     try:
         with conn.cursor() as cur:
-            query = """
-                SELECT users.id, users.fullname, tasks.id AS task_id, tasks.title AS task_title
-                FROM users
-                INNER JOIN tasks ON users.id = tasks.user_id
-                INNER JOIN status ON tasks.status_id = status.id
-                WHERE status.name = %s;
-            """
-            cur.execute(query, ("in_progress",))
+            cur.execute(USERS_WITH_STATUS_TASKS_SQL, ("in_progress",))
             users_with_tasks = cur.fetchall()
             if users_with_tasks:
                 return users_with_tasks
@@ -334,24 +618,11 @@ def get_users_with_in_progress_tasks(conn):
         return []
 
 
+@with_connection
 def get_users_and_task_count(conn):
     try:
         with conn.cursor() as cur:
-            query = """
-                SELECT 
-                    users.id AS user_id, 
-                    users.fullname AS user_fullname, 
-                    COUNT(tasks.id) AS task_count
-                FROM 
-                    users
-                LEFT JOIN 
-                    tasks ON users.id = tasks.user_id
-                GROUP BY 
-                    users.id
-                ORDER BY 
-                    user_fullname;
-            """
-            cur.execute(query)
+            cur.execute(USERS_AND_TASK_COUNT_SQL)
             users_task_count = cur.fetchall()
 
             if users_task_count:
@@ -363,128 +634,150 @@ def get_users_and_task_count(conn):
         return []
 
 
-conn = create_connection()
-if conn:
-    user_id = 19  # For all users, or you can specify a user_id
-    task_id = 1  # Specify the task_id to update
-    new_status_name = (
-        "in_progress"  # Specify the new status ('new', 'in_progress', 'completed')
-    )
-    print()
-    status_name = (
-        None  # For a specific status, or you can leave it as None for all statuses
-    )
-
-    update_task_status(conn, task_id, new_status_name)
-    print("-----------------------------------------------------------------")
-
-    tasks = get_tasks(conn, user_id, status_name)
-    if tasks:
-        for task in tasks:
-            print(
-                f"Task ID: {task[0]}, Title: {task[1]}, Description: {task[2]}, Status: {task[3]}"
-            )
-    else:
-        print(f"No tasks found.")
-    print("-----------------------------------------------------------------")
+# Same as get_users_and_task_count, read from the user_task_count view
+@with_connection
+def get_users_and_task_count_cached(conn):
+    try:
+        with conn.cursor() as cur:
+            cur.execute(USERS_AND_TASK_COUNT_CACHED_SQL)
+            users_task_count = cur.fetchall()
+            return users_task_count or None
+    except Exception as e:
+        print(f"Error fetching users and their task count: {e}")
+        return []
 
-    users_without_tasks = get_users_without_tasks(conn)
-    if users_without_tasks:
-        print("Users without tasks:")
-        print()
-        for user in users_without_tasks:
-            print(f"User ID: {user[0]}, Name: {user[1]}")
-    else:
-        print("No users without tasks.")
-    print("-----------------------------------------------------------------")
-
-    user_id = 1  # Specify the user_id
-    title = f"Next task for Lucky user №{user_id}"  # Task title
-    description = "Description of the new task"  # Task description
-    status_name = "new"  # Task status (ensure this status exists in the 'status' table)
-    insert_task(conn, user_id, title, description, status_name)
-    print("-----------------------------------------------------------------")
-
-    incomplete_tasks = get_incomplete_tasks(conn)
-
-    if incomplete_tasks:
-        print("Incomplete tasks:")
-        for task in incomplete_tasks:
-            print(
-                f"Task ID: {task[0]}, Title: {task[1]}, Description: {task[2]}, Status: {task[3]}"
-            )
-    else:
-        print("No incomplete tasks.")
-    print("-----------------------------------------------------------------")
-
-    task_id = 1  # Specify the task_id you want to delete
-    delete_task(conn, task_id)
-    print("-----------------------------------------------------------------")
-
-    email_pattern = "lynn03@example.net"  # Define the email pattern
-    users_with_email = get_users_by_email(conn, email_pattern)
-    if users_with_email:
-        print(f"Users with the given email {email_pattern}:")
-        for user in users_with_email:
-            print(f"User ID: {user[0]}, \nUsername: {user[1]}, \nEmail: {user[2]}")
-    else:
-        print("No users found with the given email pattern.")
-    print("-----------------------------------------------------------------")
-
-    user_id = 1  # The ID of the user whose name you want to update
-    new_fullname = "Elizabeth Dixon_Smith"  # The new name you want to set
-    update_user_name(conn, user_id, new_fullname)
-    print("-----------------------------------------------------------------")
-
-    task_counts = get_task_count_by_status(conn)
-    if task_counts:
-        print("Task counts by status:")
-        for status_name, task_count in task_counts:
-            print(f"Status: {status_name}, Task Count: {task_count}")
-    else:
-        print("No task counts found.")
-    print("-----------------------------------------------------------------")
-
-    domain = "gmail.com"  # Specify the domain
-    tasks = get_tasks_by_email_domain(conn, domain)
-    if tasks:
-        print(f"Tasks for users with email domain {domain}:")
-        for task in tasks:
-            print(
-                f"Task ID: {task[0]}, Title: {task[1]}, Description: {task[2]}, User Email: {task[3]}"
-            )
-    else:
-        print(f"No tasks found for users with email domain '@{domain}'.")
-    print("-----------------------------------------------------------------")
-
-    tasks_without_description = get_tasks_without_description(conn)
-    if tasks_without_description:
-        print("Tasks without description:")
-        for task in tasks_without_description:
-            print(f"Task ID: {task[0]}, Title: {task[1]}")
-    else:
-        print("No tasks without description.")
-    print("-----------------------------------------------------------------")
-
-    users_with_in_progress = get_users_with_in_progress_tasks(conn)
-    if users_with_in_progress:
-        print("Users with in progress tasks:")
-        for user in users_with_in_progress:
-            print(
-                f"User ID: {user[0]}, Name: {user[1]}, Task ID: {user[2]}, Task Title: {user[3]}"
-            )
-    else:
-        print("No users with in progress tasks.")
-    print("-----------------------------------------------------------------")
 
-    users_task_count = get_users_and_task_count(conn)
-    if users_task_count:
-        print("All users and their tasks count:")
+# Streaming variant of get_users_and_task_count
+@with_connection
+def iter_users_and_task_count(conn, itersize=DEFAULT_ITERSIZE):
+    try:
+        yield from stream_rows(conn, USERS_AND_TASK_COUNT_SQL, (), itersize)
+    except Exception as e:
+        print(f"Error fetching users and their task count: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    # Check out one pooled connection for the whole demo
+    with get_connection() as conn:
+        user_id = 19  # For all users, or you can specify a user_id
+        task_id = 1  # Specify the task_id to update
+        new_status_name = (
+            "in_progress"  # Specify the new status ('new', 'in_progress', 'completed')
+        )
         print()
-        for user in users_task_count:
-            print(f"User ID: {user[0]}, User Name: {user[1]}, Task Count: {user[2]}")
-    else:
-        print("No users found.")
-    print("-----------------------------------------------------------------")
+        status_name = (
+            None  # For a specific status, or you can leave it as None for all statuses
+        )
+
+        update_task_status(conn, task_id, new_status_name)
+        print("-----------------------------------------------------------------")
 
-    conn.close()
+        tasks = get_tasks(conn, user_id, status_name)
+        if tasks:
+            for task in tasks:
+                print(
+                    f"Task ID: {task[0]}, Title: {task[1]}, Description: {task[2]}, Status: {task[3]}"
+                )
+        else:
+            print(f"No tasks found.")
+        print("-----------------------------------------------------------------")
+
+        users_without_tasks = get_users_without_tasks(conn)
+        if users_without_tasks:
+            print("Users without tasks:")
+            print()
+            for user in users_without_tasks:
+                print(f"User ID: {user[0]}, Name: {user[1]}")
+        else:
+            print("No users without tasks.")
+        print("-----------------------------------------------------------------")
+
+        user_id = 1  # Specify the user_id
+        title = f"Next task for Lucky user №{user_id}"  # Task title
+        description = "Description of the new task"  # Task description
+        status_name = "new"  # Task status (ensure this status exists in the 'status' table)
+        insert_task(conn, user_id, title, description, status_name)
+        print("-----------------------------------------------------------------")
+
+        incomplete_tasks = get_incomplete_tasks(conn)
+
+        if incomplete_tasks:
+            print("Incomplete tasks:")
+            for task in incomplete_tasks:
+                print(
+                    f"Task ID: {task[0]}, Title: {task[1]}, Description: {task[2]}, Status: {task[3]}"
+                )
+        else:
+            print("No incomplete tasks.")
+        print("-----------------------------------------------------------------")
+
+        task_id = 1  # Specify the task_id you want to delete
+        delete_task(conn, task_id)
+        print("-----------------------------------------------------------------")
+
+        email_pattern = "lynn03@example.net"  # Define the email pattern
+        users_with_email = get_users_by_email(conn, email_pattern)
+        if users_with_email:
+            print(f"Users with the given email {email_pattern}:")
+            for user in users_with_email:
+                print(f"User ID: {user[0]}, \nUsername: {user[1]}, \nEmail: {user[2]}")
+        else:
+            print("No users found with the given email pattern.")
+        print("-----------------------------------------------------------------")
+
+        user_id = 1  # The ID of the user whose name you want to update
+        new_fullname = "Elizabeth Dixon_Smith"  # The new name you want to set
+        update_user_name(conn, user_id, new_fullname)
+        print("-----------------------------------------------------------------")
+
+        task_counts = get_task_count_by_status(conn)
+        if task_counts:
+            print("Task counts by status:")
+            for status_name, task_count in task_counts:
+                print(f"Status: {status_name}, Task Count: {task_count}")
+        else:
+            print("No task counts found.")
+        print("-----------------------------------------------------------------")
+
+        domain = "gmail.com"  # Specify the domain
+        tasks = get_tasks_by_email_domain(conn, domain)
+        if tasks:
+            print(f"Tasks for users with email domain {domain}:")
+            for task in tasks:
+                print(
+                    f"Task ID: {task[0]}, Title: {task[1]}, Description: {task[2]}, User Email: {task[3]}"
+                )
+        else:
+            print(f"No tasks found for users with email domain '@{domain}'.")
+        print("-----------------------------------------------------------------")
+
+        tasks_without_description = get_tasks_without_description(conn)
+        if tasks_without_description:
+            print("Tasks without description:")
+            for task in tasks_without_description:
+                print(f"Task ID: {task[0]}, Title: {task[1]}")
+        else:
+            print("No tasks without description.")
+        print("-----------------------------------------------------------------")
+
+        users_with_in_progress = get_users_with_in_progress_tasks(conn)
+        if users_with_in_progress:
+            print("Users with in progress tasks:")
+            for user in users_with_in_progress:
+                print(
+                    f"User ID: {user[0]}, Name: {user[1]}, Task ID: {user[2]}, Task Title: {user[3]}"
+                )
+        else:
+            print("No users with in progress tasks.")
+        print("-----------------------------------------------------------------")
+
+        users_task_count = get_users_and_task_count(conn)
+        if users_task_count:
+            print("All users and their tasks count:")
+            print()
+            for user in users_task_count:
+                print(f"User ID: {user[0]}, User Name: {user[1]}, Task Count: {user[2]}")
+        else:
+            print("No users found.")
+        print("-----------------------------------------------------------------")
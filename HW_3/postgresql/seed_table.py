@@ -1,20 +1,13 @@
+import argparse
+import io
 import os
-import psycopg2
-from dotenv import load_dotenv
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from faker import Faker
 import random
 
-# Load environment variables from the .env file
-
-load_dotenv()
-
-# Parameters for PostgreSQl connection
-
-DB_NAME = os.getenv("DB_NAME")
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
+from db import get_connection
 
 num_users = 30
 statuses = ["new", "in_progress", "completed"]
@@ -25,22 +18,6 @@ num_tasks = 10
 fake = Faker()
 
 
-def create_connection():
-    # Connects to the 'hw3' database
-    try:
-        conn = psycopg2.connect(
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-        )
-        return conn
-    except psycopg2.Error as e:
-        print(f"Error connection to the '{DB_NAME}' database: {e}")
-        return None
-
-
 def insert_random_users(conn, num_users):
     # Insert random users into the users table.
     with conn.cursor() as cur:
@@ -68,14 +45,14 @@ def insert_random_status(conn, statuses):
         print(f"Inserted statuses: {','.join(statuses)}.")
 
 
-def insert_random_tasks(conn, num_tasks):
-    # Insert random tasks into the tasks table.
+def insert_random_tasks(conn, num_tasks, user_ids, status_ids):
+    # Insert random tasks into the tasks table, for the given users and statuses.
     with conn.cursor() as cur:
         for _ in range(num_tasks):
             title = fake.sentence(nb_words=3)
             description = fake.text()
-            status_id = random.randint(1, len(statuses))
-            user_id = random.randint(1, num_users)
+            status_id = random.choice(status_ids)
+            user_id = random.choice(user_ids)
             cur.execute(
                 "INSERT INTO tasks (title, description, status_id, user_id) VALUES (%s, %s, %s, %s);",
                 (title, description, status_id, user_id),
@@ -84,18 +61,169 @@ def insert_random_tasks(conn, num_tasks):
         conn.commit()
 
 
+# Bulk seeding: rows are generated by worker processes in batches, formatted
+# for COPY ... FROM STDIN (text format) and streamed into the database
+
+# Set in every worker by init_worker: ids to reference from generated tasks
+worker_ids = {}
+
+
+def init_worker(user_ids, status_ids):
+    worker_ids["users"] = user_ids
+    worker_ids["status"] = status_ids
+
+
+def copy_value(value):
+    # Escape the characters that have a meaning in COPY text format
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def copy_rows(rows):
+    return "".join("\t".join(map(copy_value, row)) + "\n" for row in rows)
+
+
+def generate_users(start, count, seed):
+    # Generate a batch of users as COPY text. The row number makes every email unique.
+    batch_fake = Faker()
+    batch_fake.seed_instance(seed + start)
+    rows = []
+    for number in range(start, start + count):
+        email = f"{batch_fake.user_name()}.{number}@{batch_fake.free_email_domain()}"
+        rows.append((batch_fake.name(), email))
+    return copy_rows(rows)
+
+
+def generate_tasks(start, count, seed):
+    # Generate a batch of tasks as COPY text for existing users and statuses.
+    batch_fake = Faker()
+    batch_fake.seed_instance(seed + start)
+    rng = random.Random(seed + start)
+    user_ids = worker_ids["users"]
+    status_ids = worker_ids["status"]
+    rows = []
+    for _ in range(count):
+        rows.append(
+            (
+                batch_fake.sentence(nb_words=3),
+                batch_fake.text(),
+                rng.choice(status_ids),
+                rng.choice(user_ids),
+            )
+        )
+    return copy_rows(rows)
+
+
+def copy_batches(conn, table, columns, generate, total, batch_size, executor, workers, seed):
+    # Stream generated batches into `table` with COPY, keeping at most two batches
+    # per worker in memory, and print progress after every batch.
+    # Row numbers continue after the rows already in the table, so that emails
+    # stay unique when the database is seeded again.
+    copy_sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    in_flight = deque()
+    start_time = time.perf_counter()
+    done = 0
+    submitted = 0
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table};")
+        first_row = cur.fetchone()[0]
+        while done < total:
+            while submitted < total and len(in_flight) < 2 * workers:
+                count = min(batch_size, total - submitted)
+                in_flight.append((count, executor.submit(generate, first_row + submitted, count, seed)))
+                submitted += count
+            count, future = in_flight.popleft()
+            cur.copy_expert(copy_sql, io.StringIO(future.result()))
+            done += count
+            elapsed = time.perf_counter() - start_time
+            print(
+                f"{table}: {done}/{total} rows ({done / total:.0%}), "
+                f"{done / elapsed:.0f} rows/s, {elapsed:.1f} s"
+            )
+    conn.commit()
+
+
+def fetch_ids(conn, table):
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT id FROM {table} ORDER BY id;")
+        return [row[0] for row in cur.fetchall()]
+
+
+def bulk_seed(conn, num_users, num_tasks, batch_size=10000, workers=None, seed=0):
+    # Seed statuses, then `num_users` users and `num_tasks` tasks with COPY.
+    workers = workers or os.cpu_count() or 1
+    insert_random_status(conn, statuses)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        copy_batches(
+            conn,
+            "users",
+            ("fullname", "email"),
+            generate_users,
+            num_users,
+            batch_size,
+            executor,
+            workers,
+            seed,
+        )
+
+    user_ids = fetch_ids(conn, "users")
+    status_ids = fetch_ids(conn, "status")
+    if not user_ids:
+        print("Error! There are no users to assign tasks to.")
+        return
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker, initargs=(user_ids, status_ids)
+    ) as executor:
+        copy_batches(
+            conn,
+            "tasks",
+            ("title", "description", "status_id", "user_id"),
+            generate_tasks,
+            num_tasks,
+            batch_size,
+            executor,
+            workers,
+            seed,
+        )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fill the hw3 database with random data")
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="generate rows in worker processes and load them with COPY",
+    )
+    parser.add_argument("--users", type=int, default=num_users, help="number of users")
+    parser.add_argument("--tasks", type=int, default=num_tasks, help="number of tasks")
+    parser.add_argument("--batch-size", type=int, default=10000, help="rows per COPY batch")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="generator processes (default: CPU count)"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed for reproducible data")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    # 1. Connect to the hw3 database
-    conn = create_connection()
-    if conn:
-        # 2. Insert random users into the 'users' table
-        insert_random_users(conn, num_users)
-
-        # 3. Insert random statuses into the 'status' table
-        insert_random_status(conn, statuses)
-        # 4. Insert random tasks into the 'tasks' table
-        insert_random_tasks(conn, num_tasks)
-        # 5. Close the connection
-        conn.close()
-    else:
-        print(f"Error! Could not connect to the 'hw3' database.")
+    args = parse_args()
+    # 1. Connect to the hw3 database (the connection goes back to the pool at the end)
+    with get_connection() as conn:
+        if args.bulk:
+            bulk_seed(conn, args.users, args.tasks, args.batch_size, args.workers, args.seed)
+        else:
+            # 2. Insert random users into the 'users' table
+            insert_random_users(conn, args.users)
+
+            # 3. Insert random statuses into the 'status' table
+            insert_random_status(conn, statuses)
+            # 4. Insert random tasks into the 'tasks' table, for any existing user
+            user_ids = fetch_ids(conn, "users")
+            if user_ids:
+                insert_random_tasks(conn, args.tasks, user_ids, fetch_ids(conn, "status"))
+            else:
+                print("Error! There are no users to assign tasks to.")